@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+import sys
+import os
+import csv
+import glob
+import json
+import argparse
+import logging
+import redis
+
+"""
+    Usage: python3 cath_index.py lookup [CATH_ID] [--organism ORGANISM] [--top N]
+           python3 cath_index.py build [OUTPUT_DIR] [ORGANISM]
+    Example: python3 cath_index.py lookup 3.40.50.300 --organism human --top 20
+
+    Inverted index from CATH superfamily to the structures that hit it, kept in Redis:
+      cath_index:<organism>:<cath_id>  sorted set, member = PDB ID, score = best hit score
+      cath_hits:<organism>:<cath_id>   hash, PDB ID -> "<score>,<plddt>"
+      cath_index:organisms             set of organisms that have been indexed
+"""
+
+REDIS_HOST = 'localhost'
+REDIS_PORT = 6379
+REDIS_DB = 0
+
+ORGANISMS_KEY = "cath_index:organisms"
+
+# Merizo search columns: plDDT of the query domain and the max TM-score of the hit
+PLDDT_COLUMN = 3
+SCORE_COLUMN = 13
+
+def index_key(organism, cath_id):
+    return f"cath_index:{organism}:{cath_id}"
+
+def hits_key(organism, cath_id):
+    return f"cath_hits:{organism}:{cath_id}"
+
+def read_hits(search_file):
+    """
+    Read a _search.tsv file and return {cath_id: (score, plddt)}, keeping the
+    best-scoring domain when several domains of the structure hit the same superfamily.
+    """
+    hits = {}
+    with open(search_file, "r") as fh:
+        reader = csv.reader(fh, delimiter='\t')
+        header = next(reader, None)
+        if header is None:
+            return hits
+        score_column = header.index("max_tm") if "max_tm" in header else SCORE_COLUMN
+        for row in reader:
+            if len(row) < 16:
+                continue
+            try:
+                plddt = float(row[PLDDT_COLUMN])
+                cath_id = json.loads(row[15]).get("cath", "Unknown")
+            except (ValueError, json.JSONDecodeError):
+                continue
+            try:
+                score = float(row[score_column])
+            except ValueError:
+                score = 0.0
+            if cath_id not in hits or score > hits[cath_id][0]:
+                hits[cath_id] = (score, plddt)
+    return hits
+
+def index_hits(redis_conn, organism, pdb_id, hits):
+    """Record the hits of one structure. Re-indexing a structure overwrites its entries."""
+    if not hits:
+        return
+    pipe = redis_conn.pipeline(transaction=False)
+    pipe.sadd(ORGANISMS_KEY, organism)
+    for cath_id, (score, plddt) in hits.items():
+        pipe.zadd(index_key(organism, cath_id), {pdb_id: score})
+        pipe.hset(hits_key(organism, cath_id), pdb_id, f"{score:.4f},{plddt:.2f}")
+    pipe.execute()
+
+def index_search_file(redis_conn, organism, search_file):
+    search_filename = os.path.basename(search_file)
+    if search_filename.endswith("_search.tsv"):
+        pdb_id = search_filename[:-11]  # Remove '_search.tsv'
+    else:
+        pdb_id = os.path.splitext(search_filename)[0]
+    hits = read_hits(search_file)
+    index_hits(redis_conn, organism, pdb_id, hits)
+    logging.info(f"Indexed {len(hits)} CATH hits for {pdb_id} ({organism}).")
+    return len(hits)
+
+def lookup(redis_conn, cath_id, organisms=None, top=None):
+    """
+    Return the structures hitting cath_id, best score first, as a list of
+    {"organism", "pdb_id", "score", "plddt"} dicts. top limits the result per organism.
+    """
+    if organisms is None:
+        organisms = sorted(o.decode('utf-8') for o in redis_conn.smembers(ORGANISMS_KEY))
+    stop = -1 if top is None else top - 1
+
+    pipe = redis_conn.pipeline(transaction=False)
+    for organism in organisms:
+        pipe.zrevrange(index_key(organism, cath_id), 0, stop)
+    ranked = pipe.execute()
+
+    pipe = redis_conn.pipeline(transaction=False)
+    for organism, pdb_ids in zip(organisms, ranked):
+        if pdb_ids:
+            pipe.hmget(hits_key(organism, cath_id), pdb_ids)
+    details = iter(pipe.execute())
+
+    results = []
+    for organism, pdb_ids in zip(organisms, ranked):
+        if not pdb_ids:
+            continue
+        for pdb_id, value in zip(pdb_ids, next(details)):
+            if value is None:
+                continue
+            score, plddt = value.decode('utf-8').split(",")
+            results.append({
+                "organism": organism,
+                "pdb_id": pdb_id.decode('utf-8'),
+                "score": float(score),
+                "plddt": float(plddt)
+            })
+    results.sort(key=lambda hit: hit["score"], reverse=True)
+    return results[:top] if top is not None else results
+
+def build(redis_conn, output_dir, organism):
+    """Backfill the index from every _search.tsv already in output_dir."""
+    search_files = glob.glob(os.path.join(output_dir, "*_search.tsv"))
+    indexed = 0
+    for search_file in search_files:
+        try:
+            index_search_file(redis_conn, organism, search_file)
+            indexed += 1
+        except Exception as e:
+            logging.error(f"Error indexing {search_file}: {e}")
+    logging.info(f"Indexed {indexed} of {len(search_files)} search files for {organism}.")
+
+def main():
+    # Configure logging here rather than at import: the pipeline and the webhook server
+    # import this module and set up their own logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Query or build the CATH superfamily to protein index.")
+    parser.add_argument("--redis-host", default=REDIS_HOST)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    lookup_parser = subparsers.add_parser("lookup", help="List structures hitting a CATH superfamily")
+    lookup_parser.add_argument("cath_id")
+    lookup_parser.add_argument("--organism", action="append", help="Restrict to organism (repeatable)")
+    lookup_parser.add_argument("--top", type=int, default=None, help="Only return the N best hits")
+
+    build_parser = subparsers.add_parser("build", help="Index existing _search.tsv files")
+    build_parser.add_argument("output_dir")
+    build_parser.add_argument("organism")
+
+    args = parser.parse_args()
+    redis_conn = redis.Redis(host=args.redis_host, port=REDIS_PORT, db=REDIS_DB)
+
+    if args.command == "lookup":
+        organisms = [o.lower() for o in args.organism] if args.organism else None
+        for hit in lookup(redis_conn, args.cath_id, organisms=organisms, top=args.top):
+            print(f"{hit['organism']}\t{hit['pdb_id']}\t{hit['score']:.4f}\t{hit['plddt']:.2f}")
+    elif args.command == "build":
+        build(redis_conn, args.output_dir, args.organism.lower())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import queue
+import fcntl
+import atexit
+import logging
+import logging.handlers
+from contextlib import contextmanager
+
+"""
+    Shared logging setup for the pipeline script, the Celery worker and the dispatcher.
+
+    Records are put on an in-memory queue by the calling thread and written by a
+    background QueueListener, so logging never blocks on disk. Each record is one
+    compact JSON line; structured fields go in extra={"fields": {...}}. Log files
+    rotate by size, with an flock around writes so the several processes sharing a
+    log file (Celery children, concurrent pipeline runs) rotate it safely.
+"""
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 50MB per file
+DEFAULT_BACKUP_COUNT = 5
+MAX_OUTPUT_CHARS = 2000  # subprocess output kept on success
+
+_listener = None
+_listener_pid = None
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "msg": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+class LockedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that serialises writes and rollovers across processes with
+    an flock, and reopens its stream when another process has rotated the file.
+    """
+
+    def __init__(self, filename, maxBytes=DEFAULT_MAX_BYTES, backupCount=DEFAULT_BACKUP_COUNT):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, delay=True)
+        self.lock_file = open(f"{self.baseFilename}.lock", "a")
+
+    def _rotated_elsewhere(self):
+        try:
+            return os.fstat(self.stream.fileno()).st_ino != os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            return True
+
+    def emit(self, record):
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            if self.stream is not None and self._rotated_elsewhere():
+                self.stream.close()
+                self.stream = None
+            super().emit(record)
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        super().close()
+        self.lock_file.close()
+
+def setup_logging(log_file, level=logging.INFO, stream_level=logging.WARNING,
+                  max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+    """
+    Route the root logger through a non-blocking queue to a size-rotated JSON log file,
+    plus stdout for records at stream_level and above. If the log directory does not
+    exist (e.g. outside a deployed node), everything goes to stdout instead.
+    Safe to call again after a fork; the listener is restarted in the new process.
+    """
+    global _listener, _listener_pid
+    if _listener is not None:
+        if _listener_pid == os.getpid():
+            stop_logging()
+        _listener = None
+
+    handlers = []
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    if os.path.isdir(os.path.dirname(os.path.abspath(log_file))):
+        file_handler = LockedRotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+        stream_handler.setLevel(stream_level)
+    handlers.append(stream_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+    return _listener
+
+def stop_logging():
+    """Flush queued records; registered with atexit so short-lived scripts lose nothing."""
+    global _listener
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+        for handler in _listener.handlers:
+            if isinstance(handler, logging.FileHandler):
+                handler.close()
+    _listener = None
+
+atexit.register(stop_logging)
+
+def log_stage(stage, level=logging.INFO, **fields):
+    logging.log(level, stage, extra={"fields": dict(fields, stage=stage)})
+
+@contextmanager
+def timed_stage(stage, timings=None, **fields):
+    """
+    Log one structured record for a pipeline stage with its duration and outcome.
+    If a timings dict is given, the duration is also stored in it under the stage name.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        duration = round(time.monotonic() - start, 3)
+        if timings is not None:
+            timings[stage] = duration
+        log_stage(stage, level=logging.ERROR, status="error", duration_s=duration, error=type(e).__name__, **fields)
+        raise
+    duration = round(time.monotonic() - start, 3)
+    if timings is not None:
+        timings[stage] = duration
+    log_stage(stage, status="ok", duration_s=duration, **fields)
+
+def truncate_output(text, limit=MAX_OUTPUT_CHARS):
+    """Keep the head and (mostly) the tail of subprocess output, where errors usually are."""
+    if text is None:
+        return ""
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', errors='replace')
+    if len(text) <= limit:
+        return text
+    head = limit // 4
+    tail = limit - head
+    return f"{text[:head]}\n...[{len(text) - limit} chars truncated]...\n{text[-tail:]}"
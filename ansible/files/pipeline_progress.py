@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import os
+import time
+import json
+import logging
+import threading
+from collections import defaultdict, deque
+
+"""
+    Per-organism progress of proteome runs, maintained from task events.
+
+    Producers (the dispatcher and the Celery task) update persistent counters in
+    Redis and publish the counter's new value on a channel:
+      progress:organisms    set of organisms seen
+      progress:<organism>   hash with total, already_done, dispatched, done, no_hit, failed
+      pipeline_events       pub/sub channel carrying {"organism", "field", "value", "ts"}
+
+    The dispatcher resets the hash when it starts a run (start_run), counting structures
+    parsed by earlier runs as already_done, and publishes a "reset" event with the new counts.
+    ProgressTracker seeds itself from the counters, then applies events as they
+    arrive, so serving /progress or /metrics never touches Redis or the NFS share.
+    Within a run counters only grow, so applying an event is max(current, value):
+    replaying or reordering events is harmless.
+"""
+
+ORGANISMS_KEY = "progress:organisms"
+EVENTS_CHANNEL = "pipeline_events"
+COMPLETION_FIELDS = ("done", "no_hit", "failed")
+THROUGHPUT_WINDOW = 900  # seconds of completions used for the rolling rate
+
+def progress_key(organism):
+    return f"progress:{organism}"
+
+def run_label(organism, mode=None, database_path=None):
+    """
+    Label of a run, used for its dispatched set, progress counters, task results,
+    summaries and CATH index entries. database_path is None for the default database;
+    only the main run against it is labelled by the organism alone, so re-annotation
+    runs never share state with it (e.g. human-search-only, human-<database name>).
+    """
+    if database_path:
+        return f"{organism}-{os.path.basename(os.path.normpath(database_path))}"
+    if mode == "search-only":
+        return f"{organism}-search-only"
+    return organism
+
+def _publish(redis_conn, organism, field, value, **extra):
+    event = dict(extra, organism=organism, field=field, value=value, ts=time.time())
+    redis_conn.publish(EVENTS_CHANNEL, json.dumps(event))
+
+def _increment(redis_conn, organism, field, count):
+    pipe = redis_conn.pipeline()
+    pipe.sadd(ORGANISMS_KEY, organism)
+    pipe.hincrby(progress_key(organism), field, count)
+    _, value = pipe.execute()
+    _publish(redis_conn, organism, field, value)
+
+def start_run(redis_conn, organism, total, already_done=0):
+    """Called by the dispatcher when it starts; counters left by a previous run are dropped."""
+    key = progress_key(organism)
+    counts = {"total": total, "already_done": already_done, "dispatched": 0, "done": 0, "no_hit": 0, "failed": 0}
+    pipe = redis_conn.pipeline()
+    pipe.sadd(ORGANISMS_KEY, organism)
+    pipe.delete(key)
+    pipe.hset(key, mapping=counts)
+    pipe.execute()
+    _publish(redis_conn, organism, "reset", 0, counts=counts)
+
+def record_completion(redis_conn, organism, status):
+    """Called once per finished task; status is one of done, no_hit or failed."""
+    if status not in COMPLETION_FIELDS:
+        raise ValueError(f"Unknown completion status: {status}")
+    _increment(redis_conn, organism, status, 1)
+
+def record_dispatch(redis_conn, organism, count, total):
+    """Called by the dispatcher per batch; total only ever grows for a run."""
+    key = progress_key(organism)
+    stored = int(redis_conn.hget(key, "total") or 0)
+    if total > stored:
+        redis_conn.sadd(ORGANISMS_KEY, organism)
+        redis_conn.hset(key, "total", total)
+        _publish(redis_conn, organism, "total", total)
+    if count:
+        _increment(redis_conn, organism, "dispatched", count)
+
+class ProgressTracker:
+    def __init__(self, redis_conn, window=THROUGHPUT_WINDOW):
+        self.redis_conn = redis_conn
+        self.window = window
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.completions = defaultdict(deque)
+
+    def seed(self):
+        """Load the persistent counters; the rolling throughput starts empty."""
+        organisms = [o.decode('utf-8') for o in self.redis_conn.smembers(ORGANISMS_KEY)]
+        pipe = self.redis_conn.pipeline()
+        for organism in organisms:
+            pipe.hgetall(progress_key(organism))
+        counters = defaultdict(lambda: defaultdict(int))
+        for organism, values in zip(organisms, pipe.execute()):
+            for field, value in values.items():
+                counters[organism][field.decode('utf-8')] = int(value)
+        with self.lock:
+            self.counters = counters
+
+    def apply(self, event):
+        organism, field, value = event["organism"], event["field"], int(event["value"])
+        with self.lock:
+            if field == "reset":
+                self.counters[organism] = defaultdict(int, event["counts"])
+                self.completions[organism].clear()
+                return
+            counts = self.counters[organism]
+            counts[field] = max(counts[field], value)
+            # Each completion event is one finished task, whatever order it arrives in
+            if field in COMPLETION_FIELDS:
+                self.completions[organism].append(event.get("ts", time.time()))
+
+    def run(self):
+        """Follow the event channel forever, re-seeding after any Redis error."""
+        while True:
+            try:
+                pubsub = self.redis_conn.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(EVENTS_CHANNEL)
+                # Seed after subscribing so no event falls between the two
+                self.seed()
+                for message in pubsub.listen():
+                    try:
+                        self.apply(json.loads(message["data"]))
+                    except (ValueError, KeyError, TypeError) as e:
+                        logging.warning(f"Ignoring malformed progress event: {e}")
+            except Exception as e:
+                logging.error(f"Progress event stream failed, reconnecting: {e}")
+                time.sleep(5)
+
+    def start(self):
+        threading.Thread(target=self.run, name="progress-tracker", daemon=True).start()
+        return self
+
+    def snapshot(self, now=None):
+        now = now or time.time()
+        result = {}
+        with self.lock:
+            for organism, counts in sorted(self.counters.items()):
+                completions = self.completions[organism]
+                while completions and completions[0] < now - self.window:
+                    completions.popleft()
+                finished = sum(counts[f] for f in COMPLETION_FIELDS)
+                # Structures parsed by an earlier run never produce a completion event
+                done = counts["done"] + counts["already_done"]
+                remaining = max(counts["total"] - done - counts["no_hit"], 0)
+                per_minute = len(completions) * 60.0 / self.window
+                result[organism] = {
+                    "total": counts["total"],
+                    "done": done,
+                    "no_hit": counts["no_hit"],
+                    "failed": counts["failed"],
+                    "in_flight": max(counts["dispatched"] - finished, 0),
+                    "remaining": remaining,
+                    "throughput_per_minute": round(per_minute, 2),
+                    "eta_seconds": round(remaining * 60.0 / per_minute) if per_minute else None
+                }
+        return result
+
+    def prometheus_metrics(self):
+        """Render the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP pipeline_structures_total Structures in the run.",
+            "# TYPE pipeline_structures_total gauge"
+        ]
+        lines += [f'pipeline_structures_total{{organism="{o}"}} {s["total"]}' for o, s in snapshot.items()]
+        lines += [
+            "# HELP pipeline_structures Structures by state.",
+            "# TYPE pipeline_structures gauge"
+        ]
+        for organism, stats in snapshot.items():
+            for state in ("done", "no_hit", "failed", "in_flight", "remaining"):
+                lines.append(f'pipeline_structures{{organism="{organism}",state="{state}"}} {stats[state]}')
+        lines += [
+            "# HELP pipeline_throughput_per_minute Completed structures per minute over the rolling window.",
+            "# TYPE pipeline_throughput_per_minute gauge"
+        ]
+        lines += [f'pipeline_throughput_per_minute{{organism="{o}"}} {s["throughput_per_minute"]}' for o, s in snapshot.items()]
+        lines += [
+            "# HELP pipeline_eta_seconds Estimated seconds until the run completes.",
+            "# TYPE pipeline_eta_seconds gauge"
+        ]
+        lines += [
+            f'pipeline_eta_seconds{{organism="{o}"}} {s["eta_seconds"]}'
+            for o, s in snapshot.items() if s["eta_seconds"] is not None
+        ]
+        return "\n".join(lines) + "\n"
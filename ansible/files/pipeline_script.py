@@ -3,34 +3,65 @@ import sys
 import os
 import shutil
 import csv
+import json
+import time
 import glob
+import argparse
 import redis
 import statistics
 import logging
 from subprocess import Popen, PIPE
 from collections import defaultdict
 
+from cath_index import index_search_file
+from pipeline_logging import setup_logging, timed_stage, truncate_output
+from task_results import emit_result
+from pipeline_progress import run_label
+
 """
-    Usage: python3 pipeline_script.py [PDB_FILE] [OUTPUT_DIR] [ORGANISM]
+    Usage: python3 pipeline_script.py [PDB_FILE] [OUTPUT_DIR] [ORGANISM] [--mode MODE] [--database DB_PATH]
     Example: python3 pipeline_script.py /mnt/datasets/test/test.pdb /mnt/results/test/ test
+
+    Modes:
+      easy-search     segment and search in one Merizo call (default)
+      segment-search  segment once into the artifact store (reused if already there), then search
+      search-only     search the stored domains of a previously segmented structure; the PDB
+                      file itself is not needed, so any database can be applied after the fact
+
+    The dispatched set, summaries and CATH index entries of search-only runs, or of runs
+    given --database, use their own label (see pipeline_progress.run_label).
 """
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Structured, size-rotated log shared by all pipeline runs on this node (configured in main)
+PIPELINE_LOG_FILE = '/opt/data_pipeline/pipeline.log'
 
 VIRTUALENV_PYTHON = '/opt/merizo_search/merizosearch_env/bin/python3'
+MERIZO_SCRIPT = '/opt/merizo_search/merizo_search/merizo.py'
+DEFAULT_DATABASE = '/home/almalinux/merizo_search/examples/database/cath-4.3-foldclassdb'
 
-# Redis configuration
-REDIS_HOST = 'localhost'
+# Redis configuration (the Celery worker points this at the shared Redis on the storage node)
+REDIS_HOST = os.environ.get('PIPELINE_REDIS_HOST', 'localhost')
 REDIS_PORT = 6379
 REDIS_DB = 0
 
+# Organism-level summaries (plDDT_means.csv, <organism>_cath_summary.csv) live here
+RESULTS_DIR = '/mnt/results'
+
+# Per-structure Merizo segmentation (domain PDBs + segment TSV), shared over NFS:
+# <ARTIFACT_DIR>/<organism>/<id>/{manifest.json, segment.tsv, domains/}
+ARTIFACT_DIR = os.path.join(RESULTS_DIR, 'artifacts')
+
+MODES = ['easy-search', 'segment-search', 'search-only']
+
+# Column layout of easy-search's _search.tsv, which results_parser.py and cath_index.py read.
+# Plain `merizo search` on stored domains lacks the segmentation columns; they are joined
+# back in from the artifact (see join_segmentation).
+SEARCH_COLUMNS = [
+    'query', 'chopping', 'conf', 'plddt', 'emb_rank', 'target', 'cos_sim', 'q_len', 't_len',
+    'ali_len', 'seq_id', 'q_tm', 't_tm', 'max_tm', 'rmsd', 'metadata'
+]
+SEGMENT_COLUMNS = ['chopping', 'conf', 'plddt']
+
 def run_parser(search_file, output_dir):
     logging.info(f"Search File: {search_file}")
     logging.info(f"Output Directory: {output_dir}")
@@ -40,12 +71,13 @@ def run_parser(search_file, output_dir):
     try:
         p = Popen(cmd, stdout=PIPE, stderr=PIPE)
         out, err = p.communicate()
-        if out:
-            logging.debug(f"PARSER STDOUT:\n{out.decode('utf-8')}")
-        if err:
-            logging.debug(f"PARSER STDERR:\n{err.decode('utf-8')}")
         if p.returncode != 0:
+            # Keep the full output only when the parser fails
+            logging.error(f"PARSER STDOUT:\n{out.decode('utf-8', errors='replace')}")
+            logging.error(f"PARSER STDERR:\n{err.decode('utf-8', errors='replace')}")
             raise RuntimeError("Parser encountered an error.")
+        if err:
+            logging.debug(f"PARSER STDERR:\n{truncate_output(err)}")
         logging.info(f"Parser completed successfully for {search_file}.")
     except Exception as e:
         logging.error(f"Error during Parsing: {e}")
@@ -56,27 +88,19 @@ def run_merizo_search(pdb_file, output_dir, id, database_path, redis_conn, dispa
     logging.info(f"VIRTUALENV_PYTHON is executable: {os.access(VIRTUALENV_PYTHON, os.X_OK)}")
     os.makedirs(output_dir, exist_ok=True)
     logging.info(f"Using output directory: {output_dir}")
-    merizo_script = '/opt/merizo_search/merizo_search/merizo.py'
-    tmp_dir = os.path.join(output_dir, "tmp")
+    tmp_dir = structure_tmp_dir(output_dir, id)
     os.makedirs(tmp_dir, exist_ok=True)
     logging.info(f"Using tmp directory: {tmp_dir}")
 
     cmd = [
-        VIRTUALENV_PYTHON, merizo_script, 'easy-search',
+        VIRTUALENV_PYTHON, MERIZO_SCRIPT, 'easy-search',
         pdb_file, database_path, output_dir, tmp_dir,
         '--iterate', '--output_headers', '-d', 'cpu', '--threads', '1'
     ]
     logging.info(f'STEP 1: RUNNING MERIZO: {" ".join(cmd)}')
 
     try:
-        p = Popen(cmd, stdout=PIPE, stderr=PIPE)
-        out, err = p.communicate()
-        if out:
-            logging.debug(f"MERIZO STDOUT:\n{out.decode('utf-8')}")
-        if err:
-            logging.debug(f"MERIZO STDERR:\n{err.decode('utf-8')}")
-        if p.returncode != 0:
-            raise RuntimeError("Merizo Search encountered an error.")
+        run_merizo_command(cmd)
         logging.info(f"Merizo Search completed successfully for {pdb_file}.")
 
         old_search = os.path.join(output_dir, "_search.tsv")
@@ -114,28 +138,266 @@ def run_merizo_search(pdb_file, output_dir, id, database_path, redis_conn, dispa
         logging.error(f"Error during Merizo Search: {e}")
         raise
 
-def aggregate_plddt(output_dir, organism):
-    logging.info(f"Aggregating plDDT values for {organism}...")
-    plDDT_values = []
+def structure_tmp_dir(output_dir, id):
+    # One tmp dir per structure, so concurrent runs sharing output_dir never clean up each other's files
+    return os.path.join(output_dir, "tmp", id)
+
+def cleanup_partial_outputs(pdb_file, output_dir, organism, pid):
+    """
+    Remove what a killed pipeline_script.py run (process id pid) may have left behind:
+    its tmp dir and any half-built segmentation artifact.
+    """
+    id = os.path.splitext(os.path.basename(pdb_file))[0]
+    for path in (structure_tmp_dir(output_dir, id), f"{artifact_path(organism, id)}.tmp.{pid}"):
+        if os.path.exists(path):
+            shutil.rmtree(path, ignore_errors=True)
+            logging.info(f"Removed partial output '{path}'.")
+
+def run_merizo_command(cmd):
+    p = Popen(cmd, stdout=PIPE, stderr=PIPE)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        # Keep the full output only when Merizo fails
+        logging.error(f"MERIZO STDOUT:\n{out.decode('utf-8', errors='replace')}")
+        logging.error(f"MERIZO STDERR:\n{err.decode('utf-8', errors='replace')}")
+        raise RuntimeError("Merizo Search encountered an error.")
+    if err:
+        logging.debug(f"MERIZO STDERR:\n{truncate_output(err)}")
+
+def artifact_path(organism, id, artifact_dir=None):
+    return os.path.join(artifact_dir or ARTIFACT_DIR, organism, id)
+
+def load_segmentation(artifact):
+    """Return the stored segmentation manifest, or None if the structure has not been segmented."""
+    manifest_file = os.path.join(artifact, "manifest.json")
+    if not os.path.isfile(manifest_file):
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as mf:
+        return json.load(mf)
+
+def run_merizo_segment(pdb_file, artifact, id):
+    """
+    Segment pdb_file into domains and store them as an artifact. The artifact is built
+    in a staging directory and renamed into place, so a manifest is only ever visible
+    for a complete segmentation.
+    """
+    staging = f"{artifact}.tmp.{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    domains_dir = os.path.join(staging, "domains")
+    os.makedirs(domains_dir)
 
-    # Gather all .parsed files in the output_dir for the specified organism
-    parsed_files = glob.glob(os.path.join(output_dir, "*.parsed"))
-    for parsed_file in parsed_files:
-        try:
-            with open(parsed_file, "r") as pf:
-                first_line = pf.readline().strip()
-                if first_line.startswith("#"):
-                    parts = first_line.split("mean plddt:")
-                    if len(parts) == 2:
-                        try:
-                            mean_plddt = float(parts[1])
-                            plDDT_values.append(mean_plddt)
-                        except ValueError:
-                            logging.warning(f"Invalid plDDT in {parsed_file}")
-        except Exception as e:
-            logging.error(f"Error processing {parsed_file}: {e}")
-            continue
+    cmd = [
+        VIRTUALENV_PYTHON, MERIZO_SCRIPT, 'segment',
+        pdb_file, os.path.join(domains_dir, id),
+        '--iterate', '--save_domains', '--output_headers', '-d', 'cpu', '--threads', '1'
+    ]
+    logging.info(f'STEP 1a: RUNNING MERIZO SEGMENT: {" ".join(cmd)}')
+    try:
+        run_merizo_command(cmd)
+
+        segment_file = os.path.join(domains_dir, f"{id}_segment.tsv")
+        if not os.path.isfile(segment_file):
+            raise FileNotFoundError(f"Error: '{id}_segment.tsv' not found in {domains_dir}")
+        os.rename(segment_file, os.path.join(staging, "segment.tsv"))
+
+        manifest = {
+            "pdb_id": id,
+            "pdb_file": pdb_file,
+            "domains": sorted(os.path.basename(d) for d in glob.glob(os.path.join(domains_dir, "*.pdb"))),
+            "created": int(time.time())
+        }
+        with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as mf:
+            json.dump(manifest, mf)
+
+        if os.path.exists(artifact):
+            shutil.rmtree(artifact)
+        os.rename(staging, artifact)
+        logging.info(f"Stored segmentation of {pdb_file} ({len(manifest['domains'])} domains) in {artifact}")
+        return manifest
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def get_segmentation(pdb_file, artifact, id):
+    manifest = load_segmentation(artifact)
+    if manifest is not None:
+        logging.info(f"Reusing stored segmentation for {id} from {artifact}")
+        return manifest
+    os.makedirs(os.path.dirname(artifact), exist_ok=True)
+    return run_merizo_segment(pdb_file, artifact, id)
+
+def domain_plddt(domain_file):
+    """Mean plDDT of a domain, read from the B-factor column of its CA atoms (as AlphaFold stores it)."""
+    values = []
+    with open(domain_file, "r", errors="replace") as fh:
+        for line in fh:
+            if line.startswith("ATOM") and line[12:16].strip() == "CA":
+                values.append(float(line[60:66]))
+    return statistics.mean(values) if values else 0.0
+
+def domain_name(path):
+    name = os.path.basename(path)
+    return name[:-4] if name.endswith(".pdb") else name
+
+def read_domain_annotations(artifact, manifest):
+    """
+    Return {domain name: {"chopping", "conf", "plddt"}} for the stored domains.
+    The chopping string in segment.tsv lists domains in order (comma separated), matching
+    the numbered domain files; conf is the segmentation confidence of the chain.
+    """
+    segment_file = os.path.join(artifact, "segment.tsv")
+    with open(segment_file, "r") as fh:
+        row = next(csv.DictReader(fh, delimiter='\t'), None)
+    if row is None:
+        raise ValueError(f"Empty segmentation in {segment_file}")
+    chopping_column = next((c for c in ("chopping", "result") if c in row), None)
+    conf_column = next((c for c in ("conf", "pIoU") if c in row), None)
+    if chopping_column is None or conf_column is None:
+        raise ValueError(f"Unexpected columns in {segment_file}: {list(row)}")
+
+    choppings = [c for c in row[chopping_column].split(",") if c]
+    domains = manifest["domains"]
+    if len(choppings) != len(domains):
+        raise ValueError(f"{segment_file} lists {len(choppings)} domains but {len(domains)} are stored")
+    return {
+        domain_name(domain): {
+            "chopping": chopping,
+            "conf": row[conf_column],
+            "plddt": f"{domain_plddt(os.path.join(artifact, 'domains', domain)):.4f}"
+        }
+        for domain, chopping in zip(domains, choppings)
+    }
+
+def join_segmentation(search_file, annotations):
+    """
+    Rewrite a `merizo search` result in place in the easy-search column layout, filling
+    chopping, conf and plddt per query domain. Raises ValueError rather than writing rows
+    the parser would misread.
+    """
+    with open(search_file, "r") as fh:
+        reader = csv.reader(fh, delimiter='\t')
+        header = next(reader, None)
+        rows = list(reader)
+    if header == SEARCH_COLUMNS:
+        return
+    missing = [c for c in SEARCH_COLUMNS if c not in SEGMENT_COLUMNS and c not in (header or [])]
+    if missing:
+        raise ValueError(f"Unexpected columns in {search_file}: missing {missing}")
+    index = {column: i for i, column in enumerate(header)}
+
+    tmp_path = f"{search_file}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, "w", newline='') as fh:
+            writer = csv.writer(fh, delimiter='\t', lineterminator='\n')
+            writer.writerow(SEARCH_COLUMNS)
+            for row in rows:
+                query = domain_name(row[index['query']])
+                if query not in annotations:
+                    raise ValueError(f"No stored segmentation for domain {query} in {search_file}")
+                annotation = annotations[query]
+                writer.writerow(
+                    [query] + [annotation[c] for c in SEGMENT_COLUMNS] +
+                    [row[index[c]] for c in SEARCH_COLUMNS[len(SEGMENT_COLUMNS) + 1:]]
+                )
+        os.replace(tmp_path, search_file)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def run_merizo_search_domains(artifact, manifest, output_dir, id, database_path, redis_conn, dispatched_set_key):
+    """
+    Search the stored domains of one structure against database_path.
+    Returns the path of <id>_search.tsv, or None if there are no hits.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    domain_files = [os.path.join(artifact, "domains", d) for d in manifest["domains"]]
+    if not domain_files:
+        logging.warning(f"No domains stored for {id}. Skipping search.")
+        redis_conn.sadd(dispatched_set_key, manifest["pdb_file"])
+        return None
+
+    tmp_dir = structure_tmp_dir(output_dir, id)
+    os.makedirs(tmp_dir, exist_ok=True)
+    cmd = [
+        VIRTUALENV_PYTHON, MERIZO_SCRIPT, 'search',
+        *domain_files, database_path, os.path.join(output_dir, id), tmp_dir,
+        '--output_headers', '-d', 'cpu', '--threads', '1'
+    ]
+    logging.info(f'STEP 1b: RUNNING MERIZO SEARCH: {" ".join(cmd)}')
+    try:
+        run_merizo_command(cmd)
+        logging.info(f"Merizo Search completed successfully for {id} against {database_path}.")
+
+        search_file = os.path.join(output_dir, f"{id}_search.tsv")
+        if not os.path.isfile(search_file):
+            logging.warning(f"No hits found for {id}. Skipping parsing.")
+            redis_conn.sadd(dispatched_set_key, manifest["pdb_file"])
+            return None
+
+        with open(search_file, 'r') as f:
+            if len(f.readlines()) <= 1:
+                logging.warning(f"No hits found in '{search_file}'. Skipping parsing.")
+                redis_conn.sadd(dispatched_set_key, manifest["pdb_file"])
+                return None
+
+        join_segmentation(search_file, read_domain_annotations(artifact, manifest))
+        # Keep <id>_segment.tsv next to the search results, as easy-search does
+        shutil.copyfile(os.path.join(artifact, "segment.tsv"), os.path.join(output_dir, f"{id}_segment.tsv"))
+        return search_file
 
+    except Exception as e:
+        logging.error(f"Error during Merizo Search: {e}")
+        raise
+
+def read_parsed_file(parsed_file):
+    """
+    Read a single .parsed file.
+    Returns (mean_plddt, cath_counts); mean_plddt is None if the header is missing or invalid.
+    """
+    mean_plddt = None
+    cath_counts = defaultdict(int)
+    with open(parsed_file, "r") as pf:
+        first_line = pf.readline().strip()
+        if first_line.startswith("#"):
+            parts = first_line.split("mean plddt:")
+            if len(parts) == 2:
+                try:
+                    mean_plddt = float(parts[1])
+                except ValueError:
+                    logging.warning(f"Invalid plDDT in {parsed_file}")
+
+        reader = csv.reader(pf)
+        # Skip the header
+        next(reader, None)
+        for row in reader:
+            if len(row) != 2:
+                logging.warning(f"Invalid row format in {parsed_file}: {row}")
+                continue
+            cath_id, count_str = row
+            try:
+                cath_counts[cath_id] += int(count_str)
+            except ValueError:
+                logging.warning(f"Invalid count value in {parsed_file}: {count_str}")
+    return mean_plddt, cath_counts
+
+def atomic_write_csv(path, fieldnames, rows):
+    """
+    Write rows to path via a temporary file in the same directory and an atomic rename,
+    so readers never see a partially written CSV.
+    """
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, "w", newline='', encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def write_plddt_means(organism, plDDT_values, results_dir=RESULTS_DIR):
     # Calculate overall mean and standard deviation
     if plDDT_values:
         overall_mean_plDDT = statistics.mean(plDDT_values)
@@ -145,8 +407,7 @@ def aggregate_plddt(output_dir, organism):
 
     logging.info(f"Organism: {organism.capitalize()}, Mean plDDT: {overall_mean_plDDT}, Std Dev plDDT: {overall_std_dev_plDDT}")
 
-    # Update /mnt/results/plDDT_means.csv with mean & std dev for this organism
-    results_dir = "/mnt/results"
+    # Update <results_dir>/plDDT_means.csv with mean & std dev for this organism
     os.makedirs(results_dir, exist_ok=True)
 
     plddt_means_file = os.path.join(results_dir, "plDDT_means.csv")
@@ -175,19 +436,52 @@ def aggregate_plddt(output_dir, organism):
 
     # Write back all data to plDDT_means.csv
     try:
-        with open(plddt_means_file, "w", newline='', encoding="utf-8") as pmf:
-            writer = csv.DictWriter(pmf, fieldnames=["Organism", "Mean_plDDT", "StdDev_plDDT"])
-            writer.writeheader()
-            for org, stats in sorted(existing_data.items()):
-                writer.writerow({
+        atomic_write_csv(
+            plddt_means_file,
+            ["Organism", "Mean_plDDT", "StdDev_plDDT"],
+            [
+                {
                     "Organism": org.capitalize(),
                     "Mean_plDDT": f"{stats['Mean_plDDT']:.4f}",
                     "StdDev_plDDT": f"{stats['StdDev_plDDT']:.4f}"
-                })
+                }
+                for org, stats in sorted(existing_data.items())
+            ]
+        )
         logging.info(f"Updated {plddt_means_file} with organism '{organism.capitalize()}'")
     except Exception as e:
         logging.error(f"Error writing to {plddt_means_file}: {e}")
 
+def write_cath_summary(organism, cath_counts, results_dir=RESULTS_DIR):
+    # Write to the summary CSV
+    summary_file = os.path.join(results_dir, f"{organism}_cath_summary.csv")
+    try:
+        atomic_write_csv(
+            summary_file,
+            ["cath_id", "count"],
+            [{"cath_id": cath_id, "count": count} for cath_id, count in sorted(cath_counts.items())]
+        )
+        logging.info(f"Aggregated CATH counts written to {summary_file}")
+    except Exception as e:
+        logging.error(f"Error writing to {summary_file}: {e}")
+
+def aggregate_plddt(output_dir, organism):
+    logging.info(f"Aggregating plDDT values for {organism}...")
+    plDDT_values = []
+
+    # Gather all .parsed files in the output_dir for the specified organism
+    parsed_files = glob.glob(os.path.join(output_dir, "*.parsed"))
+    for parsed_file in parsed_files:
+        try:
+            mean_plddt, _ = read_parsed_file(parsed_file)
+            if mean_plddt is not None:
+                plDDT_values.append(mean_plddt)
+        except Exception as e:
+            logging.error(f"Error processing {parsed_file}: {e}")
+            continue
+
+    write_plddt_means(organism, plDDT_values)
+
 def aggregate_cath_counts(output_dir, organism):
     logging.info(f"Aggregating CATH counts for {organism}...")
     cath_counts = defaultdict(int)
@@ -196,58 +490,76 @@ def aggregate_cath_counts(output_dir, organism):
     parsed_files = glob.glob(os.path.join(output_dir, "*.parsed"))
     for parsed_file in parsed_files:
         try:
-            with open(parsed_file, "r") as pf:
-                reader = csv.reader(pf)
-                # Skip the comment line
-                next(reader, None)
-                # Skip the header
-                next(reader, None)
-                for row in reader:
-                    if len(row) != 2:
-                        logging.warning(f"Invalid row format in {parsed_file}: {row}")
-                        continue
-                    cath_id, count_str = row
-                    try:
-                        count = int(count_str)
-                        cath_counts[cath_id] += count
-                    except ValueError:
-                        logging.warning(f"Invalid count value in {parsed_file}: {count_str}")
+            _, file_counts = read_parsed_file(parsed_file)
+            for cath_id, count in file_counts.items():
+                cath_counts[cath_id] += count
         except Exception as e:
             logging.error(f"Error processing {parsed_file}: {e}")
             continue
 
-    # Write to the summary CSV
-    summary_file = os.path.join("/mnt/results", f"{organism}_cath_summary.csv")
-    try:
-        with open(summary_file, "w", newline='', encoding="utf-8") as sf:
-            writer = csv.DictWriter(sf, fieldnames=["cath_id", "count"])
-            writer.writeheader()
-            for cath_id, count in sorted(cath_counts.items()):
-                writer.writerow({"cath_id": cath_id, "count": count})
-        logging.info(f"Aggregated CATH counts written to {summary_file}")
-    except Exception as e:
-        logging.error(f"Error writing to {summary_file}: {e}")
+    write_cath_summary(organism, cath_counts)
+
+def dispatched_key(label):
+    # Must match the dispatcher's key, so re-annotation runs never skip production structures
+    return f"dispatched_tasks:{label}"
 
-def pipeline(pdb_file, output_dir, organism):
+def pipeline(pdb_file, output_dir, organism, mode='easy-search', database_path=None):
+    """
+    Run one structure through Merizo and the parser; database_path None means DEFAULT_DATABASE.
+    Returns a summary dict with hits, mean_plddt and per-stage timings.
+    """
+    label = run_label(organism, mode, database_path)
+    database_path = database_path or DEFAULT_DATABASE
     # Initialize Redis connection
     try:
         redis_conn = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
-        dispatched_set_key = f"dispatched_tasks:{organism}"
+        dispatched_set_key = dispatched_key(label)
     except Exception as e:
         logging.error(f"Failed to connect to Redis: {e}")
         sys.exit(1)
 
-    search_file = run_merizo_search(
-        pdb_file, output_dir,
-        id=os.path.splitext(os.path.basename(pdb_file))[0],
-        database_path='/home/almalinux/merizo_search/examples/database/cath-4.3-foldclassdb',
-        redis_conn=redis_conn,
-        dispatched_set_key=dispatched_set_key
-    )
+    id = os.path.splitext(os.path.basename(pdb_file))[0]
+    summary = {"hits": 0, "mean_plddt": None, "timings": {}}
+    timings = summary["timings"]
+    if mode == 'easy-search':
+        with timed_stage("merizo_search", timings=timings, pdb_id=id, organism=organism):
+            search_file = run_merizo_search(
+                pdb_file, output_dir,
+                id=id,
+                database_path=database_path,
+                redis_conn=redis_conn,
+                dispatched_set_key=dispatched_set_key
+            )
+    else:
+        artifact = artifact_path(organism, id)
+        with timed_stage("segment", timings=timings, pdb_id=id, organism=organism):
+            if mode == 'search-only':
+                manifest = load_segmentation(artifact)
+                if manifest is None:
+                    raise FileNotFoundError(f"No stored segmentation for {id} in {artifact}")
+            else:
+                manifest = get_segmentation(pdb_file, artifact, id)
+        with timed_stage("search", timings=timings, pdb_id=id, organism=organism):
+            search_file = run_merizo_search_domains(
+                artifact, manifest, output_dir, id, database_path, redis_conn, dispatched_set_key
+            )
 
     # If no valid search_file or no data => skip parser
     if search_file:
-        run_parser(search_file, output_dir)
+        with timed_stage("parse", timings=timings, pdb_id=id, organism=organism):
+            run_parser(search_file, output_dir)
+        parsed_file = os.path.join(output_dir, f"{id}.parsed")
+        if os.path.isfile(parsed_file):
+            summary["mean_plddt"], cath_counts = read_parsed_file(parsed_file)
+            summary["hits"] = sum(cath_counts.values())
+        # Keep the CATH -> protein index current; a failure here must not fail the structure
+        try:
+            with timed_stage("index", timings=timings, pdb_id=id, organism=organism):
+                index_search_file(redis_conn, label, search_file)
+        except Exception as e:
+            logging.error(f"Error indexing CATH hits for {search_file}: {e}")
+    elif mode == 'search-only':
+        logging.info(f"No search results to parse for {pdb_file}.")
     else:
         logging.info(f"No search results to parse for {pdb_file}.")
         # Remove the .pdb so it won't get redispatched
@@ -258,7 +570,7 @@ def pipeline(pdb_file, output_dir, organism):
             logging.error(f"Error removing {pdb_file}: {e}")
 
     # Clean up tmp dir
-    tmp_dir = os.path.join(output_dir, "tmp")
+    tmp_dir = structure_tmp_dir(output_dir, id)
     if os.path.exists(tmp_dir):
         try:
             shutil.rmtree(tmp_dir)
@@ -268,6 +580,8 @@ def pipeline(pdb_file, output_dir, organism):
     else:
         logging.info(f"Temporary directory '{tmp_dir}' does not exist. No cleanup needed.")
 
+    return summary
+
 def aggregate_results(output_dir, organism):
     # Aggregate plDDT values
     aggregate_plddt(output_dir, organism)
@@ -276,36 +590,50 @@ def aggregate_results(output_dir, organism):
     aggregate_cath_counts(output_dir, organism)
 
 def main():
-    if len(sys.argv) != 4:
-        logging.error("Usage: python3 pipeline_script.py <PDB_FILE> <OUTPUT_DIR> <ORGANISM>")
-        logging.error("Example: python3 pipeline_script.py /mnt/datasets/test/test.pdb /mnt/results/test/ test")
-        sys.exit(1)
+    setup_logging(PIPELINE_LOG_FILE)
 
-    pdb_file = sys.argv[1]
-    output_dir = sys.argv[2]
-    organism = sys.argv[3].lower()
+    parser = argparse.ArgumentParser(description="Run Merizo Search and the results parser on one structure.")
+    parser.add_argument("pdb_file")
+    parser.add_argument("output_dir")
+    parser.add_argument("organism")
+    parser.add_argument("--mode", choices=MODES, default='easy-search')
+    parser.add_argument("--database", default=None, help=f"Merizo/Foldclass database to search against (default: {DEFAULT_DATABASE})")
+    args = parser.parse_args()
+
+    pdb_file = args.pdb_file
+    output_dir = args.output_dir
+    organism = args.organism.lower()
 
     if organism not in ["human", "ecoli", "test"]:
         logging.error("Error: ORGANISM must be either 'human', 'ecoli', or 'test'")
         sys.exit(1)
 
-    if not os.path.isfile(pdb_file):
+    # Search-only works from the stored domains; the PDB may already have been removed
+    if args.mode != 'search-only' and not os.path.isfile(pdb_file):
         logging.error(f"No PDB file found: {pdb_file}")
         sys.exit(1)
 
     # Run pipeline (merizo + parser if data)
     try:
-        pipeline(pdb_file, output_dir, organism)
+        summary = pipeline(pdb_file, output_dir, organism, mode=args.mode, database_path=args.database)
     except Exception as e:
         logging.error(f"Pipeline execution failed: {e}")
+        emit_result({"error": type(e).__name__})
         sys.exit(1)
 
     # Then aggregate results for that organism
     try:
-        aggregate_results(output_dir, organism)
+        label = run_label(organism, args.mode, args.database)
+        with timed_stage("aggregate", timings=summary["timings"], organism=organism, label=label):
+            aggregate_results(output_dir, label)
     except Exception as e:
         logging.error(f"Aggregation failed: {e}")
+        summary["error"] = type(e).__name__
+        emit_result(summary)
         sys.exit(1)
 
+    # Last line of stdout: the compact summary the Celery task turns into its result record
+    emit_result(summary)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
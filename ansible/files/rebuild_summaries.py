@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import sys
+import os
+import glob
+import argparse
+import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline_script import RESULTS_DIR, read_parsed_file, write_plddt_means, write_cath_summary
+from results_parser import parse_search_file
+
+"""
+    Usage: python3 rebuild_summaries.py [OUTPUT_DIR] [LABEL] [--workers N] [--chunk-size N] [--reparse]
+    Example: python3 rebuild_summaries.py /mnt/results/human/ human --reparse
+             python3 rebuild_summaries.py /mnt/results/human_cath44/ human-cath44
+
+    LABEL is the organism, or the run label of a re-annotation run (see pipeline_progress.run_label).
+
+    Regenerates plDDT_means.csv and <organism>_cath_summary.csv from every .parsed file
+    in OUTPUT_DIR, reading and parsing the files across a process pool.
+"""
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+
+DEFAULT_CHUNK_SIZE = 500
+
+def is_stale(search_file, parsed_file):
+    """A .parsed file is stale if it is missing or older than its _search.tsv."""
+    if not os.path.isfile(parsed_file):
+        return True
+    return os.path.getmtime(parsed_file) < os.path.getmtime(search_file)
+
+def has_hits(search_file):
+    """Same rule as the pipeline: a _search.tsv with only its header line has no hits."""
+    with open(search_file, "r") as fh:
+        fh.readline()
+        return fh.readline() != ""
+
+def collect_work_items(output_dir, reparse=False):
+    """
+    Build the list of (search_file, parsed_file) pairs to process.
+    search_file is None unless reparse is set and the .parsed file needs re-deriving.
+    """
+    parsed_files = set(glob.glob(os.path.join(output_dir, "*.parsed")))
+    items = []
+    if reparse:
+        for search_file in glob.glob(os.path.join(output_dir, "*_search.tsv")):
+            # No-hit structures keep a header-only _search.tsv and no .parsed; they are not data points
+            if not has_hits(search_file):
+                continue
+            id = os.path.basename(search_file)[:-11]  # Remove '_search.tsv'
+            parsed_file = os.path.join(output_dir, f"{id}.parsed")
+            parsed_files.discard(parsed_file)
+            items.append((search_file, parsed_file))
+    items.extend((None, parsed_file) for parsed_file in parsed_files)
+    return sorted(items, key=lambda item: item[1])
+
+def process_chunk(output_dir, chunk):
+    """
+    Worker entry point: optionally re-derive stale .parsed files, then read them.
+    Returns (plDDT_values, cath_counts, reparsed, errors) for the chunk.
+    """
+    plDDT_values = []
+    cath_counts = defaultdict(int)
+    reparsed = 0
+    errors = 0
+    for search_file, parsed_file in chunk:
+        try:
+            if search_file and is_stale(search_file, parsed_file):
+                if parse_search_file(search_file, output_dir) is None:
+                    continue
+                reparsed += 1
+            mean_plddt, file_counts = read_parsed_file(parsed_file)
+        except Exception as e:
+            logging.error(f"Error processing {parsed_file}: {e}")
+            errors += 1
+            continue
+        if mean_plddt is not None:
+            plDDT_values.append(mean_plddt)
+        for cath_id, count in file_counts.items():
+            cath_counts[cath_id] += count
+    return plDDT_values, dict(cath_counts), reparsed, errors
+
+def rebuild(output_dir, organism, results_dir=RESULTS_DIR, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, reparse=False):
+    items = collect_work_items(output_dir, reparse=reparse)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    logging.info(f"Rebuilding summaries for {organism} from {len(items)} files in {len(chunks)} chunks.")
+
+    plDDT_values = []
+    cath_counts = defaultdict(int)
+    reparsed = 0
+    errors = 0
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_chunk, output_dir, chunk) for chunk in chunks]
+            # Merge in submission order so the plDDT list (and its stdev) is deterministic
+            for future in futures:
+                chunk_values, chunk_counts, chunk_reparsed, chunk_errors = future.result()
+                plDDT_values.extend(chunk_values)
+                for cath_id, count in chunk_counts.items():
+                    cath_counts[cath_id] += count
+                reparsed += chunk_reparsed
+                errors += chunk_errors
+
+    logging.info(f"Read {len(plDDT_values)} plDDT values, {len(cath_counts)} CATH IDs; re-parsed {reparsed} files, {errors} errors.")
+    write_plddt_means(organism, plDDT_values, results_dir=results_dir)
+    write_cath_summary(organism, cath_counts, results_dir=results_dir)
+    return plDDT_values, cath_counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild organism summaries from .parsed files in parallel.")
+    parser.add_argument("output_dir", help="Directory containing the organism's .parsed and _search.tsv files")
+    parser.add_argument("organism", help="Organism (human, ecoli or test) or a run label such as human-search-only")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help=f"Where summaries are written (default: {RESULTS_DIR})")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Files per pool task")
+    parser.add_argument("--reparse", action="store_true", help="Re-derive .parsed files that are missing or older than their _search.tsv")
+    args = parser.parse_args()
+
+    organism = args.organism.lower()
+    if organism.split("-", 1)[0] not in ["human", "ecoli", "test"]:
+        logging.error("Error: LABEL must start with 'human', 'ecoli', or 'test'")
+        sys.exit(1)
+
+    if not os.path.isdir(args.output_dir):
+        logging.error(f"No output directory found: {args.output_dir}")
+        sys.exit(1)
+
+    if args.chunk_size < 1:
+        logging.error("Error: --chunk-size must be at least 1")
+        sys.exit(1)
+
+    rebuild(
+        args.output_dir, organism,
+        results_dir=args.results_dir,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        reparse=args.reparse
+    )
+
+if __name__ == "__main__":
+    main()
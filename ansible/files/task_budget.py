@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+import os
+import time
+import signal
+import logging
+import subprocess
+
+"""
+    Wall-clock and memory budgets for one pipeline run.
+
+    budget_for() scales the limits with the number of residues in the structure and
+    run_with_budget() runs the command in its own process group, watching the summed
+    RSS of every process in the group (pipeline_script.py and the Merizo processes it
+    starts). On an overrun the whole group is terminated, then killed after a grace period.
+"""
+
+BASE_TIMEOUT = 300  # seconds
+TIMEOUT_PER_RESIDUE = 1.0  # seconds
+BASE_RSS_MB = 1024
+RSS_PER_RESIDUE_MB = 2.0
+MAX_TIMEOUT = 2 * 3600
+MAX_RSS_MB = 6 * 1024
+
+# celery_setup.yml sizes each node's normal lane so that its slots x MAX_RSS_MB, plus
+# HEAVY_MAX_RSS_MB on the heavy lane's node and a reserve for the OS, fit in memory;
+# change the copies of these caps there (task_max_rss_mb, heavy_max_rss_mb) together.
+# The heavy lane runs one task at a time, so it can afford a much larger budget.
+HEAVY_MULTIPLIER = 4
+HEAVY_MAX_TIMEOUT = 4 * 3600
+HEAVY_MAX_RSS_MB = 10 * 1024
+
+POLL_INTERVAL = 1.0  # seconds
+KILL_GRACE = 10  # seconds between SIGTERM and SIGKILL
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def count_residues(pdb_file):
+    """Count CA atoms as a cheap residue count; None if the file cannot be read."""
+    try:
+        with open(pdb_file, "r", errors="replace") as fh:
+            return sum(1 for line in fh if line.startswith("ATOM") and line[12:16].strip() == "CA")
+    except OSError:
+        return None
+
+def budget_for(pdb_file, heavy=False):
+    """Return (timeout_s, rss_limit_mb) for a structure."""
+    residues = count_residues(pdb_file)
+    if residues is None:
+        # e.g. search-only runs whose .pdb has been removed: fall back to the caps
+        timeout_s, rss_mb = MAX_TIMEOUT, MAX_RSS_MB
+    else:
+        timeout_s = min(BASE_TIMEOUT + TIMEOUT_PER_RESIDUE * residues, MAX_TIMEOUT)
+        rss_mb = min(BASE_RSS_MB + RSS_PER_RESIDUE_MB * residues, MAX_RSS_MB)
+    if heavy:
+        timeout_s = min(timeout_s * HEAVY_MULTIPLIER, HEAVY_MAX_TIMEOUT)
+        rss_mb = min(rss_mb * HEAVY_MULTIPLIER, HEAVY_MAX_RSS_MB)
+    return int(timeout_s), int(rss_mb)
+
+def process_group_rss_mb(pgid):
+    """Sum the resident memory of every process in the process group, in MB."""
+    total_pages = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat", "r") as fh:
+                # Fields after the ')' that closes the command name: state, ppid, pgrp, ... rss is 22nd
+                fields = fh.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[2]) == pgid:
+            total_pages += int(fields[21])
+    return total_pages * PAGE_SIZE / (1024 * 1024)
+
+def _stop_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        process.wait(timeout=KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        pass
+    # Kill whatever is left in the group (e.g. a Merizo child ignoring SIGTERM) so it
+    # cannot keep holding the output pipes
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+def run_with_budget(cmd, timeout_s, rss_limit_mb, env=None, poll_interval=POLL_INTERVAL):
+    """
+    Run cmd under a wall-clock and RSS budget. Returns a dict with returncode, stdout,
+    stderr, pid, duration_s, peak_rss_mb and overrun (None, "timeout" or "memory").
+    """
+    start = time.monotonic()
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env,
+        start_new_session=True
+    )
+    peak_rss_mb = 0.0
+    overrun = None
+    while True:
+        try:
+            # Retrying communicate() after a timeout does not lose any output
+            stdout, stderr = process.communicate(timeout=poll_interval)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        peak_rss_mb = max(peak_rss_mb, process_group_rss_mb(process.pid))
+        if peak_rss_mb > rss_limit_mb:
+            overrun = "memory"
+        elif time.monotonic() - start > timeout_s:
+            overrun = "timeout"
+        if overrun:
+            logging.warning(f"Budget exceeded ({overrun}) for pid {process.pid}; stopping process group.")
+            _stop_group(process)
+            stdout, stderr = process.communicate()
+            break
+
+    return {
+        "returncode": process.returncode,
+        "stdout": stdout,
+        "stderr": stderr,
+        "pid": process.pid,
+        "duration_s": round(time.monotonic() - start, 3),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "overrun": overrun
+    }
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import redis
+
+"""
+    Compact per-structure result records for pipeline tasks.
+
+    pipeline_script.py prints one summary line (RESULT_PREFIX + JSON) as the last
+    line of its stdout; the Celery task folds it into a fixed-schema record:
+      task_results:<label>      hash of pdb_id -> compact JSON record
+      task_results:<label>:ts   sorted set of pdb_id scored by write time
+    where <label> is the run label (see pipeline_progress.run_label). Each record
+    expires RESULT_TTL after it was written: every write trims expired records from
+    both keys, readers skip any not yet trimmed, and both keys expire once the label
+    has been idle for RESULT_TTL.
+    Full stdout/stderr is only kept for failed runs, in a log file on the shared
+    results volume that the record points to.
+
+    Usage:
+        task_results.py <label> [--status failed]
+"""
+
+REDIS_HOST = os.environ.get('PIPELINE_REDIS_HOST', 'localhost')
+REDIS_PORT = 6379
+REDIS_DB = 0
+
+RESULT_PREFIX = "PIPELINE_RESULT "
+RESULT_TTL = 7 * 24 * 3600  # seconds
+FAILURE_LOG_DIR = "/mnt/results/failures"
+STATUSES = ("done", "no_hit", "failed", "rerouted")
+SCAN_COUNT = 1000
+TRIM_BATCH = 500  # expired records removed per write, so a write stays cheap
+
+def results_key(label):
+    return f"task_results:{label}"
+
+def results_ts_key(label):
+    return f"task_results:{label}:ts"
+
+def emit_result(summary, stream=None):
+    """Print the run summary for the Celery task; must be the last line written to stdout."""
+    print(RESULT_PREFIX + json.dumps(summary, separators=(",", ":")), file=stream or sys.stdout, flush=True)
+
+def parse_result(stdout):
+    """Return the summary printed by emit_result(), or {} if the run died before printing it."""
+    for line in reversed((stdout or "").splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            try:
+                return json.loads(line[len(RESULT_PREFIX):])
+            except ValueError:
+                logging.warning(f"Malformed result line: {line[:200]}")
+                return {}
+    return {}
+
+def error_class(run, summary):
+    """timeout or memory for budget overruns, the exception name for a failed run, else None."""
+    if run["overrun"]:
+        return run["overrun"]
+    if run["returncode"] == 0:
+        return None
+    return summary.get("error") or f"exit_{run['returncode']}"
+
+def write_failure_log(label, pdb_id, run, failure_dir=FAILURE_LOG_DIR):
+    """Keep the full output of a failed run; returns the log path, or None if it could not be written."""
+    log_dir = os.path.join(failure_dir, label)
+    log_path = os.path.join(log_dir, f"{pdb_id}.log")
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        with open(log_path, "w") as fh:
+            fh.write(f"returncode: {run['returncode']}\n")
+            fh.write(f"overrun: {run['overrun']}\n")
+            fh.write(f"duration_s: {run['duration_s']}\n")
+            fh.write(f"peak_rss_mb: {run['peak_rss_mb']}\n")
+            fh.write("----- stdout -----\n")
+            fh.write(run["stdout"] or "")
+            fh.write("\n----- stderr -----\n")
+            fh.write(run["stderr"] or "")
+    except OSError as e:
+        logging.error(f"Failed to write failure log {log_path}: {e}")
+        return None
+    return log_path
+
+def build_record(pdb_id, status, run, summary=None, log_path=None):
+    if status not in STATUSES:
+        raise ValueError(f"Unknown task status: {status}")
+    summary = summary or {}
+    return {
+        "pdb_id": pdb_id,
+        "status": status,
+        "hits": summary.get("hits", 0),
+        "mean_plddt": summary.get("mean_plddt"),
+        "timings": summary.get("timings", {}),
+        "error": error_class(run, summary),
+        "log": log_path,
+        "duration_s": run["duration_s"],
+        "peak_rss_mb": run["peak_rss_mb"],
+        "ts": round(time.time(), 3)
+    }
+
+def store_record(redis_conn, label, record, ttl=RESULT_TTL):
+    """Store the record under its pdb_id (a rerun overwrites it) and drop expired records."""
+    key, ts_key = results_key(label), results_ts_key(label)
+    pipe = redis_conn.pipeline()
+    pipe.hset(key, record["pdb_id"], json.dumps(record, separators=(",", ":")))
+    pipe.zadd(ts_key, {record["pdb_id"]: record["ts"]})
+    pipe.expire(key, ttl)
+    pipe.expire(ts_key, ttl)
+    pipe.execute()
+
+    expired = redis_conn.zrangebyscore(ts_key, "-inf", record["ts"] - ttl, start=0, num=TRIM_BATCH)
+    if expired:
+        pipe = redis_conn.pipeline()
+        pipe.hdel(key, *expired)
+        pipe.zrem(ts_key, *expired)
+        pipe.execute()
+
+def load_records(redis_conn, label, status=None, ttl=RESULT_TTL):
+    """Iterate over the live records for a label with HSCAN, optionally only one status."""
+    oldest = time.time() - ttl
+    for _, value in redis_conn.hscan_iter(results_key(label), count=SCAN_COUNT):
+        record = json.loads(value)
+        if record["ts"] < oldest:
+            continue
+        if status is None or record["status"] == status:
+            yield record
+
+def main():
+    parser = argparse.ArgumentParser(description="List task result records for an organism.")
+    parser.add_argument("label", help="Run label: organism, <organism>-search-only or <organism>-<database name>")
+    parser.add_argument("--status", choices=STATUSES, help="Only list records with this status")
+    parser.add_argument("--redis-host", default=REDIS_HOST)
+    args = parser.parse_args()
+
+    redis_conn = redis.Redis(host=args.redis_host, port=REDIS_PORT, db=REDIS_DB)
+    for record in load_records(redis_conn, args.label.lower(), status=args.status):
+        print(json.dumps(record, separators=(",", ":")))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import os
+import time
+import logging
+import threading
+
+"""
+    Live registry of Celery workers, kept in Redis by the workers themselves.
+
+      workers:registry   set of registered worker names
+      worker:<name>      hash with queue, host, cores, concurrency and last_seen;
+                         expires unless the worker keeps heartbeating
+
+    The dispatcher, update_disabled_workers.py and the webhook server read the
+    live set from here instead of a hardcoded worker list.
+"""
+
+REGISTRY_KEY = "workers:registry"
+HEARTBEAT_INTERVAL = 15  # seconds
+HEARTBEAT_TTL = 45  # seconds; a worker missing three heartbeats drops out
+
+def worker_key(name):
+    return f"worker:{name}"
+
+def register_worker(redis_conn, name, queue, host, concurrency, cores=None, ttl=HEARTBEAT_TTL):
+    """Write (or refresh) this worker's registry entry."""
+    pipe = redis_conn.pipeline()
+    pipe.hset(worker_key(name), mapping={
+        "queue": queue,
+        "host": host,
+        "cores": cores or os.cpu_count() or 1,
+        "concurrency": concurrency,
+        "last_seen": int(time.time())
+    })
+    pipe.expire(worker_key(name), ttl)
+    pipe.sadd(REGISTRY_KEY, name)
+    pipe.execute()
+
+def deregister_worker(redis_conn, name):
+    pipe = redis_conn.pipeline()
+    pipe.delete(worker_key(name))
+    pipe.srem(REGISTRY_KEY, name)
+    pipe.execute()
+
+def start_heartbeat(redis_conn, name, queue, host, concurrency, interval=HEARTBEAT_INTERVAL):
+    """
+    Register the worker and keep refreshing the entry from a daemon thread.
+    Returns the threading.Event that stops the heartbeat when set.
+    """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.is_set():
+            try:
+                register_worker(redis_conn, name, queue, host, concurrency)
+            except Exception as e:
+                logging.error(f"Worker heartbeat failed for {name}: {e}")
+            stop.wait(interval)
+
+    threading.Thread(target=beat, name=f"heartbeat-{name}", daemon=True).start()
+    return stop
+
+def live_workers(redis_conn):
+    """
+    Return {name: {"queue", "host", "cores", "concurrency"}} for every worker
+    whose heartbeat has not expired. Expired names are pruned from the registry.
+    """
+    names = sorted(n.decode('utf-8') for n in redis_conn.smembers(REGISTRY_KEY))
+    pipe = redis_conn.pipeline()
+    for name in names:
+        pipe.hgetall(worker_key(name))
+    entries = pipe.execute()
+
+    workers = {}
+    expired = []
+    for name, entry in zip(names, entries):
+        if not entry:
+            expired.append(name)
+            continue
+        entry = {k.decode('utf-8'): v.decode('utf-8') for k, v in entry.items()}
+        workers[name] = {
+            "queue": entry.get("queue", f"{name}_queue"),
+            "host": entry.get("host", ""),
+            "cores": int(entry.get("cores", 1)),
+            "concurrency": int(entry.get("concurrency", 1))
+        }
+    if expired:
+        redis_conn.srem(REGISTRY_KEY, *expired)
+        logging.info(f"Pruned expired workers from registry: {expired}")
+    return workers
+
+def worker_for_host(redis_conn, host):
+    """Return the name of the live worker registered from the given IP, or None."""
+    for name, info in live_workers(redis_conn).items():
+        if info["host"] == host:
+            return name
+    return None
+
+def weighted_schedule(workers):
+    """
+    Expand {name: info} into a list of (name, queue) slots where each worker appears
+    in proportion to its concurrency, interleaved (smooth weighted round robin) so a
+    batch is spread across workers rather than sent to one worker at a time.
+    """
+    weights = {name: max(info["concurrency"], 1) for name, info in workers.items()}
+    total = sum(weights.values())
+    current = {name: 0 for name in weights}
+    schedule = []
+    for _ in range(total):
+        for name, weight in weights.items():
+            current[name] += weight
+        chosen = max(sorted(current), key=lambda name: current[name])
+        current[chosen] -= total
+        schedule.append((chosen, workers[chosen]["queue"]))
+    return schedule
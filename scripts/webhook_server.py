@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-from flask import Flask, request
+from flask import Flask, Response, request, jsonify
+import redis
 import subprocess
 import json
 import logging
@@ -7,6 +8,11 @@ import fcntl
 import os
 import time
 
+import cath_index
+from worker_registry import worker_for_host
+from pipeline_progress import ProgressTracker
+import task_results
+
 app = Flask(__name__)
 logging.basicConfig(
     filename='/opt/data_pipeline/alert_receiver.log',
@@ -38,6 +44,20 @@ def load_inventory_mapping():
 
 INSTANCE_TO_WORKER = load_inventory_mapping()
 
+def load_redis_host():
+    try:
+        with open(INVENTORY_PATH, 'r') as f:
+            inventory = json.load(f)
+        return inventory['storagegroup']['hosts']['storage']['ansible_host']
+    except Exception as e:
+        logging.error(f"Error reading Redis host from inventory: {e}")
+        return 'localhost'
+
+REDIS_CONN = redis.Redis(host=load_redis_host(), port=6379, db=0)
+
+# Kept current from task completion events; requests are served from memory
+PROGRESS = ProgressTracker(REDIS_CONN).start()
+
 def acquire_lock(lock_file, timeout=LOCK_TIMEOUT):
     start_time = time.time()
     while True:
@@ -72,6 +92,12 @@ def alertmanager_webhook():
                 status = alert.get('status')
                 instance = alert.get('labels', {}).get('instance', '').split(':')[0]
                 worker_name = INSTANCE_TO_WORKER.get(instance)
+                if not worker_name:
+                    # Workers added after startup are only known through the live registry
+                    try:
+                        worker_name = worker_for_host(REDIS_CONN, instance)
+                    except redis.RedisError as e:
+                        logging.error(f"Worker registry lookup failed for {instance}: {e}")
                 
                 if not worker_name:
                     logging.warning(f"No worker mapping found for instance: {instance}")
@@ -128,5 +154,36 @@ def alertmanager_webhook():
     
     return '', 200
 
+@app.route('/cath/<cath_id>', methods=['GET'])
+def cath_lookup(cath_id):
+    organisms = request.args.getlist('organism') or None
+    top = request.args.get('top', type=int)
+    try:
+        hits = cath_index.lookup(REDIS_CONN, cath_id, organisms=organisms, top=top)
+    except redis.RedisError as e:
+        logging.error(f"CATH index lookup failed for {cath_id}: {e}")
+        return jsonify({'error': 'index unavailable'}), 503
+    return jsonify({'cath_id': cath_id, 'hits': hits}), 200
+
+@app.route('/progress', methods=['GET'])
+def progress():
+    return jsonify(PROGRESS.snapshot()), 200
+
+@app.route('/results/<label>', methods=['GET'])
+def results(label):
+    status = request.args.get('status')
+    if status and status not in task_results.STATUSES:
+        return jsonify({'error': f'unknown status {status}'}), 400
+    try:
+        records = list(task_results.load_records(REDIS_CONN, label, status=status))
+    except redis.RedisError as e:
+        logging.error(f"Result lookup failed for {label}: {e}")
+        return jsonify({'error': 'results unavailable'}), 503
+    return jsonify({'label': label, 'records': records}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(PROGRESS.prometheus_metrics(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080)
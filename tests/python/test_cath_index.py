@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import MagicMock
+
+# If cath_index.py is in your PYTHONPATH or a package:
+import cath_index
+
+HEADER = "query\tchopping\tconf\tplddt\temb_rank\ttarget\tcos_sim\tq_len\tt_len\tali_len\tseq_id\tq_tm\tt_tm\tmax_tm\trmsd\tmetadata\n"
+
+def hit_row(plddt, max_tm, cath):
+    return f"q\t1-100\t0.9\t{plddt}\t1\tt\t0.8\t100\t100\t90\t0.5\t0.7\t0.6\t{max_tm}\t1.5\t{{\"cath\":\"{cath}\"}}\n"
+
+@pytest.fixture
+def search_file(tmp_path):
+    path = tmp_path / "AF-P12345_search.tsv"
+    path.write_text(
+        HEADER +
+        hit_row(70.0, 0.55, "3.40.50.300") +
+        hit_row(85.0, 0.81, "3.40.50.300") +
+        hit_row(60.0, 0.40, "1.10.10.10")
+    )
+    return str(path)
+
+def test_read_hits_keeps_best_domain(search_file):
+    """Several domains hitting one superfamily collapse to the best-scoring one."""
+    hits = cath_index.read_hits(search_file)
+    assert hits == {
+        "3.40.50.300": (0.81, 85.0),
+        "1.10.10.10": (0.40, 60.0),
+    }
+
+def test_index_search_file_writes_per_superfamily_keys(search_file):
+    redis_conn = MagicMock()
+    pipe = redis_conn.pipeline.return_value
+
+    assert cath_index.index_search_file(redis_conn, "human", search_file) == 2
+
+    pipe.zadd.assert_any_call("cath_index:human:3.40.50.300", {"AF-P12345": 0.81})
+    pipe.hset.assert_any_call("cath_hits:human:3.40.50.300", "AF-P12345", "0.8100,85.00")
+    pipe.execute.assert_called_once()
+
+def test_lookup_merges_organisms_by_score():
+    redis_conn = MagicMock()
+    pipe = redis_conn.pipeline.return_value
+    pipe.execute.side_effect = [
+        [[b"H1", b"H2"], [b"E1"]],
+        [[b"0.9000,88.00", b"0.5000,70.00"], [b"0.7000,91.00"]],
+    ]
+
+    hits = cath_index.lookup(redis_conn, "3.40.50.300", organisms=["human", "ecoli"], top=2)
+
+    assert [(h["organism"], h["pdb_id"]) for h in hits] == [("human", "H1"), ("ecoli", "E1")]
+    assert hits[1]["plddt"] == 91.0
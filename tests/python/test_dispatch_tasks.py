@@ -0,0 +1,145 @@
+import pytest
+import os
+import sys
+import types
+import logging
+from collections import defaultdict
+from unittest.mock import MagicMock, patch
+
+import yaml
+
+# The dispatcher is deployed inline from the playbook; load it from there.
+# pipeline_logging.py, pipeline_progress.py and worker_registry.py must be in your PYTHONPATH.
+import pipeline_logging
+
+PLAYBOOK = os.path.join(os.path.dirname(__file__), "..", "..", "ansible", "playbooks", "celery_setup.yml")
+
+def _b(value):
+    return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+class FakeRedis:
+    """Just enough of redis.Redis (sets, hashes, pipelines) for the dispatcher."""
+
+    def __init__(self):
+        self.sets = defaultdict(set)
+        self.hashes = defaultdict(dict)
+        self.published = []
+
+    def exists(self, key):
+        return int(bool(self.sets.get(key) or self.hashes.get(key)))
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+        self.hashes.pop(key, None)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def sismember(self, key, value):
+        return _b(value) in self.sets.get(key, set())
+
+    def sadd(self, key, *values):
+        self.sets[key].update(_b(v) for v in values)
+
+    def srem(self, key, *values):
+        self.sets[key].difference_update(_b(v) for v in values)
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(_b(field))
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        self.hashes[key].update({_b(f): _b(v) for f, v in items.items()})
+
+    def hincrby(self, key, field, amount=1):
+        value = int(self.hget(key, field) or 0) + amount
+        self.hset(key, field, value)
+        return value
+
+    def publish(self, channel, message):
+        self.published.append(message)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis_conn):
+        self.redis_conn = redis_conn
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis_conn, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+def load_dispatcher():
+    with open(PLAYBOOK) as fh:
+        plays = yaml.safe_load(fh)
+    task = next(t for play in plays for t in play["tasks"] if t["name"] == "Deploy Updated Dispatch Tasks Script on host")
+    source = task["copy"]["content"].replace("{{ redis_host }}", "localhost")
+    namespace = {"__name__": "dispatch_tasks"}
+    exec(compile(source, "dispatch_tasks.py", "exec"), namespace)
+    return namespace
+
+@pytest.fixture
+def dispatcher(tmp_path):
+    fake_redis = FakeRedis()
+    fake_redis.sets["workers:registry"].add(b"worker1")
+    fake_redis.hashes["worker:worker1"] = {b"queue": b"worker1_queue", b"host": b"10.0.0.1", b"cores": b"4", b"concurrency": b"4"}
+    celery_module = types.ModuleType("celery")
+    celery_module.Celery = MagicMock()
+
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    with patch.dict(sys.modules, {"celery": celery_module}), \
+         patch("redis.Redis", return_value=fake_redis):
+        yield load_dispatcher(), fake_redis
+    pipeline_logging.stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def test_restarted_dispatcher_keeps_progress(dispatcher, tmp_path):
+    """systemd restarts the dispatcher during a run; that must not reset the counters."""
+    namespace, fake_redis = dispatcher
+    input_dir, output_dir = tmp_path / "input", tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    for id in ("a", "b", "c"):
+        (input_dir / f"{id}.pdb").write_text("ATOM\n")
+    (output_dir / "a.parsed").write_text("#a\n")
+
+    namespace["main"](str(input_dir), str(output_dir), "human")
+    after_first = fake_redis.hgetall("progress:human")
+    assert after_first[b"total"] == b"3"
+    assert after_first[b"already_done"] == b"1"
+    assert after_first[b"dispatched"] == b"2"
+
+    # A task finishes, then the service restarts the dispatcher
+    fake_redis.hincrby("progress:human", "done", 1)
+    namespace["main"](str(input_dir), str(output_dir), "human")
+    after_second = fake_redis.hgetall("progress:human")
+    assert after_second[b"dispatched"] == b"2"
+    assert after_second[b"done"] == b"1"
+    assert sum(b'"reset"' in message.encode() for message in fake_redis.published) == 1
+
+def test_reannotation_run_keeps_its_own_state(dispatcher, tmp_path):
+    """A run against another database must not share the production dispatched set or counters."""
+    namespace, fake_redis = dispatcher
+    input_dir, output_dir = tmp_path / "input", tmp_path / "cath44"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    (input_dir / "a.pdb").write_text("ATOM\n")
+    fake_redis.sadd("dispatched_tasks:human", str(input_dir / "a.pdb"))
+    fake_redis.hset("progress:human", mapping={"total": 10, "dispatched": 10})
+
+    namespace["main"](str(input_dir), str(output_dir), "human", mode="segment-search", database_path="/db/cath44")
+
+    assert fake_redis.sismember("dispatched_tasks:human-cath44", str(input_dir / "a.pdb"))
+    assert fake_redis.hgetall("progress:human")[b"dispatched"] == b"10"
+    assert fake_redis.hgetall("progress:human-cath44")[b"dispatched"] == b"1"
@@ -0,0 +1,53 @@
+import pytest
+import json
+import logging
+
+# If pipeline_logging.py is in your PYTHONPATH or a package:
+import pipeline_logging
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    pipeline_logging.stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def test_truncate_output_keeps_head_and_tail():
+    text = "HEAD" + "x" * 10000 + "TAIL"
+    out = pipeline_logging.truncate_output(text, limit=100)
+    assert out.startswith("HEAD")
+    assert out.endswith("TAIL")
+    assert "chars truncated" in out
+    assert len(out) < 200
+
+def test_truncate_output_short_and_bytes():
+    assert pipeline_logging.truncate_output(b"ok") == "ok"
+    assert pipeline_logging.truncate_output(None) == ""
+
+def test_setup_logging_writes_json_stage_records(tmp_path, restore_root_logger):
+    log_file = tmp_path / "pipeline.log"
+    pipeline_logging.setup_logging(str(log_file))
+
+    timings = {}
+    with pipeline_logging.timed_stage("parse", timings=timings, pdb_id="AF-1"):
+        pass
+    pipeline_logging.stop_logging()
+
+    record = json.loads(log_file.read_text().splitlines()[-1])
+    assert record["stage"] == "parse"
+    assert record["status"] == "ok"
+    assert record["pdb_id"] == "AF-1"
+    assert "parse" in timings
+
+def test_log_file_rotates_by_size(tmp_path, restore_root_logger):
+    log_file = tmp_path / "pipeline.log"
+    pipeline_logging.setup_logging(str(log_file), max_bytes=1000, backup_count=2)
+    for i in range(100):
+        logging.warning("x" * 50)
+    pipeline_logging.stop_logging()
+
+    assert (tmp_path / "pipeline.log.1").exists()
+    assert not (tmp_path / "pipeline.log.3").exists()
+    assert log_file.stat().st_size <= 1000
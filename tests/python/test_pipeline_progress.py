@@ -0,0 +1,83 @@
+import pytest
+import json
+from unittest.mock import MagicMock
+
+# If pipeline_progress.py is in your PYTHONPATH or a package:
+from pipeline_progress import ProgressTracker, record_completion, start_run
+
+def event(organism, field, value, ts):
+    return {"organism": organism, "field": field, "value": value, "ts": ts}
+
+@pytest.fixture
+def tracker():
+    tracker = ProgressTracker(MagicMock(), window=600)
+    tracker.apply(event("human", "total", 100, 0))
+    tracker.apply(event("human", "dispatched", 50, 0))
+    return tracker
+
+def test_snapshot_counts_and_eta(tracker):
+    for i in range(1, 31):
+        tracker.apply(event("human", "done", i, 1000 + i))
+    for i in range(1, 11):
+        tracker.apply(event("human", "no_hit", i, 1000 + i))
+    tracker.apply(event("human", "failed", 1, 1000))
+
+    stats = tracker.snapshot(now=1100)["human"]
+    assert stats["done"] == 30
+    assert stats["no_hit"] == 10
+    assert stats["in_flight"] == 50 - 41
+    assert stats["remaining"] == 60
+    # 41 completions in a 10 minute window
+    assert stats["throughput_per_minute"] == 4.1
+    assert stats["eta_seconds"] == round(60 * 60 / 4.1)
+
+def test_reordered_events_never_lower_counters(tracker):
+    tracker.apply(event("human", "done", 11, 1000))
+    tracker.apply(event("human", "done", 10, 1000))
+    stats = tracker.snapshot(now=1000)["human"]
+    assert stats["done"] == 11
+    assert stats["throughput_per_minute"] == 0.2
+
+def test_throughput_window_expires(tracker):
+    tracker.apply(event("human", "done", 1, 0))
+    stats = tracker.snapshot(now=10000)["human"]
+    assert stats["throughput_per_minute"] == 0
+    assert stats["eta_seconds"] is None
+
+def test_prometheus_metrics(tracker):
+    tracker.apply(event("human", "done", 5, 1000))
+    text = tracker.prometheus_metrics()
+    assert 'pipeline_structures_total{organism="human"} 100' in text
+    assert 'pipeline_structures{organism="human",state="done"} 5' in text
+
+def test_record_completion_publishes_new_value():
+    redis_conn = MagicMock()
+    redis_conn.pipeline.return_value.execute.return_value = [0, 7]
+    record_completion(redis_conn, "ecoli", "done")
+    channel, payload = redis_conn.publish.call_args[0]
+    assert json.loads(payload)["value"] == 7
+    with pytest.raises(ValueError):
+        record_completion(redis_conn, "ecoli", "rerouted")
+
+def test_reset_starts_a_new_run(tracker):
+    """A new run drops the old counters; structures parsed earlier count as done."""
+    tracker.apply(event("human", "done", 40, 1000))
+    counts = {"total": 100, "already_done": 60, "dispatched": 0, "done": 0, "no_hit": 0, "failed": 0}
+    tracker.apply(dict(event("human", "reset", 0, 1001), counts=counts))
+    tracker.apply(event("human", "dispatched", 10, 1002))
+    tracker.apply(event("human", "done", 1, 1003))
+
+    stats = tracker.snapshot(now=1010)["human"]
+    assert stats["done"] == 61
+    assert stats["in_flight"] == 9
+    assert stats["remaining"] == 39
+
+def test_start_run_resets_counters():
+    redis_conn = MagicMock()
+    start_run(redis_conn, "human", 100, already_done=60)
+    pipe = redis_conn.pipeline.return_value
+    pipe.delete.assert_called_once_with("progress:human")
+    assert pipe.hset.call_args[1]["mapping"]["already_done"] == 60
+    payload = json.loads(redis_conn.publish.call_args[0][1])
+    assert payload["field"] == "reset"
+    assert payload["counts"]["total"] == 100
@@ -5,7 +5,13 @@ from unittest.mock import patch, MagicMock
 from pathlib import Path
 
 # Assuming pipeline_script.py is in your PYTHONPATH or a package:
-from pipeline_script import pipeline, aggregate_results
+from pipeline_script import (
+    pipeline, aggregate_results, run_merizo_segment,
+    run_merizo_search_domains, load_segmentation
+)
+from pipeline_progress import run_label
+import results_parser
+import cath_index
 
 @pytest.fixture
 def fake_input_pdb(tmp_path):
@@ -124,3 +130,137 @@ def test_aggregate_results_with_no_parsed_files(tmp_path, organism):
 
     # For plDDT_means.csv => same note about absolute /mnt path. 
     # You might want to patch that or verify manually in an integration test.
+
+
+# `merizo search` output: no chopping/conf/plddt columns, unlike easy-search
+MERIZO_SEARCH_HEADER = "query\temb_rank\ttarget\tcos_sim\tq_len\tt_len\tali_len\tseq_id\tq_tm\tt_tm\tmax_tm\trmsd\tmetadata\n"
+
+def merizo_search_row(query, max_tm, cath):
+    return f"{query}\t1\tcath|1abcA00\t0.91\t100\t120\t95\t0.42\t0.80\t0.70\t{max_tm}\t1.20\t{{\"cath\": \"{cath}\"}}\n"
+
+def domain_pdb(plddts):
+    return "".join(
+        f"ATOM  {i:5d}  CA  ALA A{i:4d}      0.000   0.000   0.000  1.00{plddt:6.2f}           C\n"
+        for i, plddt in enumerate(plddts, start=1)
+    )
+
+@pytest.fixture
+def stored_segmentation(tmp_path):
+    """Create an artifact store holding the segmentation of one structure."""
+    artifact_dir = tmp_path / "artifacts"
+    artifact = artifact_dir / "test" / "fake"
+    (artifact / "domains").mkdir(parents=True)
+    (artifact / "domains" / "fake_merizo_01.pdb").write_text(domain_pdb([80.0, 90.0]))
+    (artifact / "segment.tsv").write_text(
+        "filename\tnres\tnres_dom\tnres_ndr\tndom\tpIoU\truntime\tresult\n"
+        "fake\t120\t100\t20\t1\t0.87\t1.5\t1-100\n"
+    )
+    (artifact / "manifest.json").write_text(
+        '{"pdb_id": "fake", "pdb_file": "/gone/fake.pdb", "domains": ["fake_merizo_01.pdb"], "created": 0}'
+    )
+    return str(artifact_dir)
+
+def test_search_only_uses_stored_domains(stored_segmentation, fake_output_dir):
+    """search-only mode searches the stored domains and never re-segments or needs the PDB."""
+    def fake_merizo(cmd):
+        Path(fake_output_dir, "fake_search.tsv").write_text(
+            MERIZO_SEARCH_HEADER + merizo_search_row("fake_merizo_01", 0.75, "3.40.50.300")
+        )
+
+    with patch("pipeline_script.ARTIFACT_DIR", stored_segmentation), \
+         patch("pipeline_script.run_merizo_command", side_effect=fake_merizo) as mock_merizo, \
+         patch("pipeline_script.run_merizo_segment") as mock_segment, \
+         patch("pipeline_script.run_parser") as mock_parser, \
+         patch("pipeline_script.index_search_file"):
+        pipeline("/gone/fake.pdb", fake_output_dir, "test", mode="search-only", database_path="/db/new")
+
+    mock_segment.assert_not_called()
+    cmd = mock_merizo.call_args[0][0]
+    assert "search" in cmd and "easy-search" not in cmd
+    assert os.path.join(stored_segmentation, "test", "fake", "domains", "fake_merizo_01.pdb") in cmd
+    assert "/db/new" in cmd
+    mock_parser.assert_called_once()
+    assert os.path.isfile(os.path.join(fake_output_dir, "fake_segment.tsv"))
+
+def test_search_only_without_segmentation_fails(tmp_path, fake_output_dir):
+    with patch("pipeline_script.ARTIFACT_DIR", str(tmp_path / "artifacts")):
+        with pytest.raises(FileNotFoundError):
+            pipeline("/gone/fake.pdb", fake_output_dir, "test", mode="search-only")
+
+def test_failed_segmentation_leaves_no_artifact(tmp_path, fake_input_pdb):
+    """A Merizo failure must not leave a half-written artifact behind."""
+    artifact = tmp_path / "artifacts" / "test" / "fake"
+    artifact.parent.mkdir(parents=True)
+    with patch("pipeline_script.run_merizo_command", side_effect=RuntimeError("boom")):
+        with pytest.raises(RuntimeError):
+            run_merizo_segment(fake_input_pdb, str(artifact), "fake")
+    assert os.listdir(artifact.parent) == []
+
+def test_pipeline_returns_compact_summary(stored_segmentation, fake_output_dir):
+    """pipeline() reports hits, mean plDDT and stage timings for the task result record."""
+    def fake_merizo(cmd):
+        Path(fake_output_dir, "fake_search.tsv").write_text(
+            MERIZO_SEARCH_HEADER + merizo_search_row("fake_merizo_01", 0.75, "3.40.50.300")
+        )
+
+    def fake_parser(search_file, output_dir):
+        Path(output_dir, "fake.parsed").write_text("#fake Results. mean plddt: 85.5\ncath_id,count\n1.10.8.10,2\n3.40.50.300,1\n")
+
+    with patch("pipeline_script.ARTIFACT_DIR", stored_segmentation), \
+         patch("pipeline_script.run_merizo_command", side_effect=fake_merizo), \
+         patch("pipeline_script.run_parser", side_effect=fake_parser), \
+         patch("pipeline_script.index_search_file"):
+        summary = pipeline("/gone/fake.pdb", fake_output_dir, "test", mode="search-only")
+
+    assert summary["hits"] == 3
+    assert summary["mean_plddt"] == 85.5
+    assert {"segment", "search", "parse", "index"} <= set(summary["timings"])
+
+def test_reannotation_is_indexed_under_its_own_label(stored_segmentation, fake_output_dir):
+    """Search-only runs and other databases never write into the organism's production index."""
+    assert run_label("human", "segment-search") == "human"
+    assert run_label("human", "search-only") == "human-search-only"
+    assert run_label("human", "segment-search", "/db/cath44/") == "human-cath44"
+
+    def fake_merizo(cmd):
+        Path(fake_output_dir, "fake_search.tsv").write_text(
+            MERIZO_SEARCH_HEADER + merizo_search_row("fake_merizo_01", 0.75, "3.40.50.300")
+        )
+
+    with patch("pipeline_script.ARTIFACT_DIR", stored_segmentation), \
+         patch("pipeline_script.run_merizo_command", side_effect=fake_merizo), \
+         patch("pipeline_script.run_parser"), \
+         patch("pipeline_script.index_search_file") as mock_index:
+        pipeline("/gone/fake.pdb", fake_output_dir, "test", mode="search-only", database_path="/db/cath44")
+
+    assert mock_index.call_args[0][1] == "test-cath44"
+
+def test_domain_search_output_matches_easy_search_layout(stored_segmentation, fake_output_dir):
+    """Joined `merizo search` output is read by the parser and the CATH index like easy-search output."""
+    def fake_merizo(cmd):
+        Path(fake_output_dir, "fake_search.tsv").write_text(
+            MERIZO_SEARCH_HEADER + merizo_search_row("fake_merizo_01.pdb", 0.75, "3.40.50.300")
+        )
+
+    artifact = os.path.join(stored_segmentation, "test", "fake")
+    with patch("pipeline_script.run_merizo_command", side_effect=fake_merizo):
+        search_file = run_merizo_search_domains(
+            artifact, load_segmentation(artifact), fake_output_dir, "fake", "/db", MagicMock(), "key"
+        )
+
+    parsed_file = results_parser.parse_search_file(search_file, fake_output_dir)
+    lines = Path(parsed_file).read_text().splitlines()
+    assert lines[0].endswith("mean plddt: 85.0")
+    assert "3.40.50.300,1" in lines
+    assert cath_index.read_hits(search_file) == {"3.40.50.300": (0.75, 85.0)}
+
+def test_unexpected_search_layout_is_rejected(stored_segmentation, fake_output_dir):
+    def fake_merizo(cmd):
+        Path(fake_output_dir, "fake_search.tsv").write_text("query\ttarget\nfake_merizo_01\tt\n")
+
+    artifact = os.path.join(stored_segmentation, "test", "fake")
+    with patch("pipeline_script.run_merizo_command", side_effect=fake_merizo):
+        with pytest.raises(ValueError):
+            run_merizo_search_domains(
+                artifact, load_segmentation(artifact), fake_output_dir, "fake", "/db", MagicMock(), "key"
+            )
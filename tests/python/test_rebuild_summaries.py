@@ -0,0 +1,72 @@
+import pytest
+import os
+import time
+from pathlib import Path
+
+# If rebuild_summaries.py is in your PYTHONPATH or a package:
+from rebuild_summaries import rebuild
+
+SEARCH_HEADER = "query\tchopping\tconf\tplddt\t5\t6\t7\t8\t9\t10\t11\t12\t13\t14\t15\tmeta\n"
+
+def write_parsed(out_dir, id, mean_plddt, counts):
+    lines = [f"#{id}_search.tsv Results. mean plddt: {mean_plddt}", "cath_id,count"]
+    lines += [f"{cath},{count}" for cath, count in counts.items()]
+    (out_dir / f"{id}.parsed").write_text("\n".join(lines) + "\n")
+
+@pytest.fixture
+def dirs(tmp_path):
+    out_dir = tmp_path / "human"
+    out_dir.mkdir()
+    results_dir = tmp_path / "summaries"
+    return out_dir, results_dir
+
+def test_rebuild_merges_chunks(dirs):
+    """Files spread over several chunks are merged into one summary."""
+    out_dir, results_dir = dirs
+    write_parsed(out_dir, "a", 50.0, {"1abc": 3, "2xyz": 1})
+    write_parsed(out_dir, "b", 70.0, {"1abc": 2})
+    write_parsed(out_dir, "c", 60.0, {"3def": 4})
+
+    rebuild(str(out_dir), "human", results_dir=str(results_dir), workers=2, chunk_size=1)
+
+    summary = (results_dir / "human_cath_summary.csv").read_text().splitlines()
+    assert summary == ["cath_id,count", "1abc,5", "2xyz,1", "3def,4"]
+
+    means = (results_dir / "plDDT_means.csv").read_text().splitlines()
+    assert means[1] == "Human,60.0000,10.0000"
+
+def test_rebuild_reparses_stale_files(dirs):
+    """With reparse, a .parsed older than its _search.tsv is re-derived first."""
+    out_dir, results_dir = dirs
+    write_parsed(out_dir, "a", 10.0, {"old": 1})
+    stale = time.time() - 60
+    os.utime(out_dir / "a.parsed", (stale, stale))
+    (out_dir / "a_search.tsv").write_text(
+        SEARCH_HEADER +
+        "a\t-\t-\t80.0\t.\t.\t.\t.\t.\t.\t.\t.\t.\t.\t.\t{\"cath\":\"1abc\"}\n"
+    )
+
+    rebuild(str(out_dir), "human", results_dir=str(results_dir), workers=1, reparse=True)
+
+    assert "1abc,1" in Path(out_dir / "a.parsed").read_text()
+    summary = (results_dir / "human_cath_summary.csv").read_text()
+    assert "1abc,1" in summary
+    assert "old" not in summary
+
+def test_rebuild_with_no_files(dirs):
+    """An empty directory still produces a header-only summary."""
+    out_dir, results_dir = dirs
+    rebuild(str(out_dir), "human", results_dir=str(results_dir))
+    assert (results_dir / "human_cath_summary.csv").read_text().strip() == "cath_id,count"
+
+def test_rebuild_reparse_skips_no_hit_search_files(dirs):
+    """A header-only _search.tsv (a no-hit structure) must not become a .parsed data point."""
+    out_dir, results_dir = dirs
+    write_parsed(out_dir, "a", 80.0, {"1abc": 1})
+    (out_dir / "b_search.tsv").write_text(SEARCH_HEADER)
+
+    rebuild(str(out_dir), "human", results_dir=str(results_dir), workers=1, reparse=True)
+
+    assert not (out_dir / "b.parsed").exists()
+    means = (results_dir / "plDDT_means.csv").read_text().splitlines()
+    assert means[1] == "Human,80.0000,0.0000"
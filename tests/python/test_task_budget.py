@@ -0,0 +1,59 @@
+import pytest
+import sys
+
+# If task_budget.py is in your PYTHONPATH or a package:
+import task_budget
+
+def write_pdb(path, residues):
+    lines = [
+        f"ATOM  {i:5d}  CA  ALA A{i:4d}      0.000   0.000   0.000  1.00 90.00           C"
+        for i in range(1, residues + 1)
+    ]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def test_budget_scales_with_structure_size(tmp_path):
+    small = task_budget.budget_for(write_pdb(tmp_path / "small.pdb", 100))
+    large = task_budget.budget_for(write_pdb(tmp_path / "large.pdb", 2000))
+    assert small[0] < large[0]
+    assert small[1] < large[1]
+
+    heavy = task_budget.budget_for(str(tmp_path / "small.pdb"), heavy=True)
+    assert heavy == (small[0] * task_budget.HEAVY_MULTIPLIER, small[1] * task_budget.HEAVY_MULTIPLIER)
+
+def test_budget_for_missing_file_uses_caps(tmp_path):
+    assert task_budget.budget_for(str(tmp_path / "gone.pdb")) == (task_budget.MAX_TIMEOUT, task_budget.MAX_RSS_MB)
+
+def test_run_with_budget_completes():
+    result = task_budget.run_with_budget([sys.executable, "-c", "print('ok')"], 30, 1024, poll_interval=0.1)
+    assert result["returncode"] == 0
+    assert result["stdout"].strip() == "ok"
+    assert result["overrun"] is None
+
+def test_run_with_budget_kills_on_timeout():
+    cmd = [sys.executable, "-c", "import time; time.sleep(30)"]
+    result = task_budget.run_with_budget(cmd, 0.5, 1024, poll_interval=0.1)
+    assert result["overrun"] == "timeout"
+    assert result["returncode"] != 0
+    assert result["duration_s"] < 10
+
+def test_run_with_budget_kills_on_memory():
+    cmd = [sys.executable, "-c", "import time; data = bytearray(300 * 1024 * 1024); time.sleep(30)"]
+    result = task_budget.run_with_budget(cmd, 30, 100, poll_interval=0.1)
+    assert result["overrun"] == "memory"
+    assert result["peak_rss_mb"] > 100
+
+def test_heavy_budget_is_capped(tmp_path):
+    timeout_s, rss_mb = task_budget.budget_for(str(tmp_path / "gone.pdb"), heavy=True)
+    assert timeout_s == task_budget.HEAVY_MAX_TIMEOUT
+    assert rss_mb == task_budget.HEAVY_MAX_RSS_MB
+
+def test_playbook_caps_match_budget():
+    """celery_setup.yml sizes worker concurrency with copies of the RSS caps."""
+    import os
+    import yaml
+    playbook = os.path.join(os.path.dirname(__file__), "..", "..", "ansible", "playbooks", "celery_setup.yml")
+    with open(playbook) as fh:
+        play_vars = yaml.safe_load(fh)[0]["vars"]
+    assert play_vars["task_max_rss_mb"] == task_budget.MAX_RSS_MB
+    assert play_vars["heavy_max_rss_mb"] == task_budget.HEAVY_MAX_RSS_MB
@@ -0,0 +1,86 @@
+import pytest
+import io
+import json
+from unittest.mock import MagicMock
+
+# If task_results.py is in your PYTHONPATH or a package:
+import task_results
+
+def run_result(returncode=0, overrun=None, stdout="", stderr=""):
+    return {
+        "returncode": returncode, "stdout": stdout, "stderr": stderr, "pid": 123,
+        "duration_s": 1.5, "peak_rss_mb": 200.0, "overrun": overrun
+    }
+
+def test_emit_and_parse_result_round_trip():
+    stream = io.StringIO()
+    print('{"level":"WARNING","msg":"noise"}', file=stream)
+    task_results.emit_result({"hits": 3, "mean_plddt": 81.2, "timings": {"parse": 0.1}}, stream=stream)
+    summary = task_results.parse_result(stream.getvalue())
+    assert summary == {"hits": 3, "mean_plddt": 81.2, "timings": {"parse": 0.1}}
+
+def test_parse_result_without_summary():
+    assert task_results.parse_result("Traceback ...\nKilled") == {}
+    assert task_results.parse_result(None) == {}
+
+def test_record_for_successful_run():
+    summary = {"hits": 2, "mean_plddt": 90.0, "timings": {"search": 4.2}}
+    record = task_results.build_record("AF-1", "done", run_result(stdout="x" * 10000), summary=summary)
+    assert record["hits"] == 2
+    assert record["error"] is None
+    assert record["log"] is None
+    assert "stdout" not in record
+
+@pytest.mark.parametrize("run, summary, expected", [
+    (run_result(returncode=-9, overrun="memory"), {}, "memory"),
+    (run_result(returncode=1), {"error": "FileNotFoundError"}, "FileNotFoundError"),
+    (run_result(returncode=2), {}, "exit_2"),
+])
+def test_error_class(run, summary, expected):
+    assert task_results.error_class(run, summary) == expected
+
+def test_failure_log_keeps_full_output(tmp_path):
+    run = run_result(returncode=1, stdout="out", stderr="Traceback: boom")
+    log_path = task_results.write_failure_log("human", "AF-1", run, failure_dir=str(tmp_path))
+    assert log_path == str(tmp_path / "human" / "AF-1.log")
+    content = (tmp_path / "human" / "AF-1.log").read_text()
+    assert "Traceback: boom" in content
+    assert "returncode: 1" in content
+
+def test_store_and_load_records():
+    redis_conn = MagicMock()
+    redis_conn.zrangebyscore.return_value = []
+    record = task_results.build_record("AF-1", "failed", run_result(returncode=1))
+    task_results.store_record(redis_conn, "human", record, ttl=60)
+    pipe = redis_conn.pipeline.return_value
+    key, field, value = pipe.hset.call_args[0]
+    assert key == "task_results:human"
+    pipe.zadd.assert_called_once_with("task_results:human:ts", {"AF-1": record["ts"]})
+    pipe.expire.assert_any_call("task_results:human", 60)
+    pipe.hdel.assert_not_called()
+
+    redis_conn.hscan_iter.return_value = [(field, value)]
+    assert [r["pdb_id"] for r in task_results.load_records(redis_conn, "human", status="failed")] == ["AF-1"]
+    assert list(task_results.load_records(redis_conn, "human", status="done")) == []
+
+def test_unknown_status_rejected():
+    with pytest.raises(ValueError):
+        task_results.build_record("AF-1", "lost", run_result())
+
+def test_store_record_trims_expired_records():
+    """Records expire individually, even while the label keeps being written to."""
+    redis_conn = MagicMock()
+    redis_conn.zrangebyscore.return_value = [b"AF-old"]
+    record = task_results.build_record("AF-1", "done", run_result())
+    task_results.store_record(redis_conn, "human", record, ttl=60)
+
+    assert redis_conn.zrangebyscore.call_args[0] == ("task_results:human:ts", "-inf", record["ts"] - 60)
+    pipe = redis_conn.pipeline.return_value
+    pipe.hdel.assert_called_once_with("task_results:human", b"AF-old")
+    pipe.zrem.assert_called_once_with("task_results:human:ts", b"AF-old")
+
+def test_load_records_skips_untrimmed_expired_records():
+    old = dict(task_results.build_record("AF-old", "done", run_result()), ts=0)
+    redis_conn = MagicMock()
+    redis_conn.hscan_iter.return_value = [(b"AF-old", json.dumps(old))]
+    assert list(task_results.load_records(redis_conn, "human")) == []
@@ -0,0 +1,40 @@
+import pytest
+from collections import Counter
+from unittest.mock import MagicMock
+
+# If worker_registry.py is in your PYTHONPATH or a package:
+import worker_registry
+
+def test_weighted_schedule_follows_concurrency():
+    """Each worker gets slots in proportion to its concurrency, interleaved."""
+    workers = {
+        "worker1": {"queue": "worker1_queue", "concurrency": 4},
+        "worker2": {"queue": "worker2_queue", "concurrency": 2},
+        "worker4": {"queue": "worker4_queue", "concurrency": 2},
+    }
+    schedule = worker_registry.weighted_schedule(workers)
+
+    assert Counter(name for name, _ in schedule) == {"worker1": 4, "worker2": 2, "worker4": 2}
+    # Slots are interleaved: every worker shows up in each half of the schedule
+    half = len(schedule) // 2
+    for part in (schedule[:half], schedule[half:]):
+        assert {name for name, _ in part} == set(workers)
+    assert ("worker4", "worker4_queue") in schedule
+
+def test_weighted_schedule_empty():
+    assert worker_registry.weighted_schedule({}) == []
+
+def test_live_workers_prunes_expired_entries():
+    redis_conn = MagicMock()
+    redis_conn.smembers.return_value = {b"worker1", b"worker2"}
+    redis_conn.pipeline.return_value.execute.return_value = [
+        {b"queue": b"worker1_queue", b"host": b"10.0.0.1", b"cores": b"8", b"concurrency": b"4"},
+        {},
+    ]
+
+    workers = worker_registry.live_workers(redis_conn)
+
+    assert workers == {
+        "worker1": {"queue": "worker1_queue", "host": "10.0.0.1", "cores": 8, "concurrency": 4}
+    }
+    redis_conn.srem.assert_called_once_with(worker_registry.REGISTRY_KEY, "worker2")